@@ -0,0 +1,68 @@
+# backend/bench_symptom_matcher.py
+"""
+증상 매처 마이크로 벤치마크
+기존 패턴별 루프(EXCLUDE_REGEXES → SYMPTOM_REGEXES)와 SYMPTOM_MATCHER를
+uploads/ 샘플 PDF의 줄/블록에 돌려 결과가 같은지 확인하고 소요 시간을 비교합니다.
+
+실행: (cd backend && python bench_symptom_matcher.py)
+"""
+import glob
+import os
+import timeit
+
+from ocr_records import (
+    EXCLUDE_REGEXES,
+    SYMPTOM_REGEXES,
+    SYMPTOM_MATCHER,
+    extract_text_from_pdf,
+)
+
+
+def legacy_labels(block: str) -> set:
+    """기존 flush_buffer의 라벨 판정"""
+    if any(rx.search(block) for rx in EXCLUDE_REGEXES):
+        return set()
+    return {label for label, pat in SYMPTOM_REGEXES.items() if pat.search(block)}
+
+
+def legacy_has_symptom(line: str) -> bool:
+    """기존 is_block_start의 패턴 판정"""
+    return any(p.search(line) for p in SYMPTOM_REGEXES.values())
+
+
+def load_samples():
+    base = os.path.dirname(os.path.abspath(__file__))
+    lines = []
+    for pdf_path in sorted(glob.glob(os.path.join(base, "uploads", "*.pdf"))):
+        text = extract_text_from_pdf(pdf_path)
+        lines.extend(line.strip() for line in text.split("\n") if line.strip())
+    # 블록: 연속된 1~3줄 묶음
+    blocks = [" ".join(lines[i:i + n]) for n in (1, 2, 3) for i in range(len(lines) - n + 1)]
+    return lines, blocks
+
+
+def main(repeat: int = 20):
+    lines, blocks = load_samples()
+    print(f"샘플: 줄 {len(lines)}개, 블록 {len(blocks)}개")
+
+    mismatched = [b for b in blocks if legacy_labels(b) != SYMPTOM_MATCHER.match(b)]
+    mismatched += [l for l in lines if legacy_has_symptom(l) != SYMPTOM_MATCHER.has_symptom(l)]
+    if mismatched:
+        raise SystemExit(f"❌ 결과 불일치 {len(mismatched)}건: {mismatched[:3]}")
+    print("✅ 라벨 결과 동일")
+
+    cases = [
+        ("블록 라벨", lambda: [legacy_labels(b) for b in blocks],
+                     lambda: [SYMPTOM_MATCHER.match(b) for b in blocks]),
+        ("블록 시작", lambda: [legacy_has_symptom(l) for l in lines],
+                     lambda: [SYMPTOM_MATCHER.has_symptom(l) for l in lines]),
+    ]
+    for name, legacy, compiled in cases:
+        t_legacy = min(timeit.repeat(legacy, number=1, repeat=repeat))
+        t_compiled = min(timeit.repeat(compiled, number=1, repeat=repeat))
+        print(f"{name}: 기존 {t_legacy * 1000:.2f}ms / 매처 {t_compiled * 1000:.2f}ms "
+              f"(x{t_legacy / t_compiled:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+# backend/chat_history.py
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+# 프로세스 메모리에 유지할 최대 세션 수 (초과 시 가장 오래 안 쓴 세션부터 제거)
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "1000"))
+# 이 시간(초) 동안 대화가 없으면 세션 제거
+CHAT_SESSION_IDLE_TTL = float(os.getenv("CHAT_SESSION_IDLE_TTL", "3600"))
+# 세션당 보관할 최대 메시지 수 (사용자/챗봇 메시지 각각 1개)
+CHAT_SESSION_MAX_MESSAGES = int(os.getenv("CHAT_SESSION_MAX_MESSAGES", "40"))
+# 프롬프트에 원문 그대로 넣을 최근 대화의 토큰 예산 (그 이전 대화는 요약으로 대체)
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+# 창 밖으로 밀려난 대화가 이 토큰 수 이상 쌓이면 한 번에 요약 (매 턴 요약 호출 방지)
+CHAT_SUMMARY_CHUNK_TOKENS = int(os.getenv("CHAT_SUMMARY_CHUNK_TOKENS", "600"))
+# 대화 기록 저장소: sqlite(chat_logs.db 공유, 여러 워커 가능) | memory(프로세스 내, 단일 워커용)
+CHAT_HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "sqlite").lower()
+# sqlite 저장소의 프로세스 내 읽기 캐시에 둘 최대 세션 수
+CHAT_HISTORY_CACHE_SIZE = int(os.getenv("CHAT_HISTORY_CACHE_SIZE", str(CHAT_SESSION_MAX)))
+CHAT_LOG_DB_PATH = os.path.join(os.path.dirname(__file__), "chat_logs", "chat_logs.db")
+
+
+class BoundedChatMessageHistory(InMemoryChatMessageHistory):
+    """
+    최근 max_messages개만 보관하는 대화 기록
+    dropped / summary / summarized_until은 HistoryWindow가 쓰는 요약 상태
+    (메시지 위치는 잘려 나간 수(dropped)를 더한 절대 위치로 기록)
+    """
+
+    max_messages: int = CHAT_SESSION_MAX_MESSAGES
+    dropped: int = 0
+    summary: str = ""
+    summarized_until: int = 0
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.messages.extend(messages)
+        if len(self.messages) > self.max_messages:
+            overflow = len(self.messages) - self.max_messages
+            del self.messages[:overflow]
+            self.dropped += overflow
+
+    def update_summary(self, summary: str, summarized_until: int) -> None:
+        self.summary = summary
+        self.summarized_until = summarized_until
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    """
+    토큰 수 근사치 (tiktoken 없이, 매 턴 호출해도 부담 없게)
+    한글 등 비ASCII 문자는 1자≈1토큰, ASCII는 4자≈1토큰, 메시지당 오버헤드 4
+    """
+    text = message.content if isinstance(message.content, str) else str(message.content)
+    non_ascii = sum(1 for ch in text if ord(ch) > 0x7F)
+    return non_ascii + (len(text) - non_ascii) // 4 + 4
+
+
+class HistoryWindow:
+    """
+    누적 요약 + 아직 요약에 반영 안 된 최근 메시지
+
+    - apply(): LLM 호출 없이 (요약, 요약 이후 메시지) → 대화 응답 지연에 요약 호출이 포함되지 않음
+    - update()/aupdate(): 응답 뒤에 호출. token_budget 창 밖으로 밀려난 메시지가 chunk_tokens 이상
+      쌓였을 때만 한 번에 요약 → 요약 호출은 여러 턴에 한 번, 원문은 token_budget + chunk_tokens 이내
+    - 최대 메시지 수(max_messages) 제한으로 다음 턴에 잘려 나갈 메시지가 요약 전이면
+      창 안이라도 오래된 절반을 먼저 요약 (요약 없이 사라지지 않도록)
+    - 요약 상태는 history.update_summary로 세션별 저장
+    """
+
+    def __init__(self,
+                 summarize: Callable[[str, List[BaseMessage]], str],
+                 asummarize: Callable[[str, List[BaseMessage]], Awaitable[str]],
+                 token_budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+                 chunk_tokens: int = CHAT_SUMMARY_CHUNK_TOKENS,
+                 token_counter: Callable[[BaseMessage], int] = estimate_tokens):
+        self.summarize = summarize
+        self.asummarize = asummarize
+        self.token_budget = token_budget
+        self.chunk_tokens = chunk_tokens
+        self.token_counter = token_counter
+
+    def _window_start(self, messages: List[BaseMessage]) -> int:
+        used = 0
+        start = len(messages)
+        while start > 0:
+            used += self.token_counter(messages[start - 1])
+            if used > self.token_budget:
+                break
+            start -= 1
+        # 사용자/챗봇 턴이 갈라지지 않도록 짝수 위치에서 시작
+        if start % 2:
+            start += 1
+        return start
+
+    @staticmethod
+    def _summarized_index(history: BoundedChatMessageHistory) -> int:
+        """history.messages에서 요약에 아직 반영 안 된 첫 메시지 위치"""
+        return min(max(history.summarized_until - history.dropped, 0), len(history.messages))
+
+    def apply(self, history: BoundedChatMessageHistory) -> Tuple[str, List[BaseMessage]]:
+        """(요약, 요약에 아직 반영 안 된 메시지)"""
+        return history.summary, history.messages[self._summarized_index(history):]
+
+    def pending(self, history: BoundedChatMessageHistory) -> Optional[Tuple[int, List[BaseMessage]]]:
+        """요약할 차례면 (요약 끝 위치, 요약할 메시지), 아니면 None"""
+        messages = history.messages
+        first = self._summarized_index(history)
+        end = self._window_start(messages)
+
+        max_messages = getattr(history, "max_messages", None)
+        if max_messages and len(messages) + 2 > max_messages + first:
+            # 다음 턴(메시지 2개)에 요약 전 메시지가 잘려 나감 → 오래된 절반까지 미리 요약
+            end = max(end, len(messages) - max_messages // 2)
+            end += end % 2
+            return (end, messages[first:end]) if end > first else None
+
+        chunk = messages[first:end]
+        if not chunk or sum(self.token_counter(m) for m in chunk) < self.chunk_tokens:
+            return None
+        return end, chunk
+
+    def update(self, history: BoundedChatMessageHistory) -> bool:
+        """필요하면 요약 갱신 (요약했으면 True)"""
+        pending = self.pending(history)
+        if pending is None:
+            return False
+        end, messages = pending
+        history.update_summary(self.summarize(history.summary, messages), history.dropped + end)
+        return True
+
+    async def aupdate(self, history: BoundedChatMessageHistory) -> bool:
+        pending = self.pending(history)
+        if pending is None:
+            return False
+        end, messages = pending
+        # 요약하는 동안 새 턴이 추가되어 dropped가 바뀔 수 있으므로 절대 위치를 먼저 계산
+        summarized_until = history.dropped + end
+        summary = await self.asummarize(history.summary, messages)
+        # sqlite 저장소는 DB에 쓰므로 이벤트 루프 밖에서
+        await asyncio.to_thread(history.update_summary, summary, summarized_until)
+        return True
+
+
+class SessionStore:
+    """
+    세션ID → 대화 기록 저장소 (LRU + 유휴 TTL)
+
+    - max_sessions를 넘으면 가장 오래 안 쓴 세션부터 제거
+    - idle_ttl초 동안 쓰이지 않은 세션은 다음 접근 때 정리
+    - 제거된 세션으로 다시 대화가 오면 loader(session_id, limit)로 chat_log에서 복원
+    """
+
+    def __init__(self,
+                 max_sessions: int = CHAT_SESSION_MAX,
+                 idle_ttl: float = CHAT_SESSION_IDLE_TTL,
+                 max_messages: int = CHAT_SESSION_MAX_MESSAGES,
+                 loader: Optional[Callable[[str, int], List[BaseMessage]]] = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.loader = loader
+        self._sessions: "OrderedDict[str, BoundedChatMessageHistory]" = OrderedDict()
+        self._last_access = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> BoundedChatMessageHistory:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            history = self._sessions.get(session_id)
+            if history is not None:
+                self._sessions.move_to_end(session_id)
+                self._last_access[session_id] = now
+                return history
+
+        # 복원(DB 조회)은 락 밖에서
+        history = BoundedChatMessageHistory(max_messages=self.max_messages)
+        if self.loader:
+            history.add_messages(self.loader(session_id, self.max_messages))
+
+        with self._lock:
+            # 그 사이 다른 요청이 같은 세션을 만들었으면 그쪽을 사용
+            history = self._sessions.setdefault(session_id, history)
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = now
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._last_access.pop(evicted, None)
+            return history
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict_idle(self, now: float):
+        # OrderedDict 앞쪽이 가장 오래 안 쓴 세션
+        while self._sessions:
+            session_id = next(iter(self._sessions))
+            if now - self._last_access[session_id] < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            del self._last_access[session_id]
+
+
+_MESSAGE_CLASSES = {"human": HumanMessage, "ai": AIMessage, "system": SystemMessage}
+
+def _message_type(message: BaseMessage) -> str:
+    # 스트리밍 응답(AIMessageChunk)도 ai로 저장
+    if isinstance(message, HumanMessage):
+        return "human"
+    if isinstance(message, SystemMessage):
+        return "system"
+    return "ai"
+
+
+class _CachedSession:
+    """읽기 캐시 항목: 최근 메시지 + 요약 상태 (seq는 세션 내 메시지 절대 위치)"""
+
+    __slots__ = ("messages", "dropped", "summary", "summarized_until")
+
+    def __init__(self, messages: List[BaseMessage], dropped: int, summary: str, summarized_until: int):
+        self.messages = messages
+        self.dropped = dropped
+        self.summary = summary
+        self.summarized_until = summarized_until
+
+    @property
+    def next_seq(self) -> int:
+        return self.dropped + len(self.messages)
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """
+    SQLiteChatHistoryStore의 세션 하나 (get() 시점의 스냅샷)
+    BoundedChatMessageHistory와 같은 속성(dropped/summary/summarized_until)을 제공
+    """
+
+    def __init__(self, store: "SQLiteChatHistoryStore", session_id: str, entry: _CachedSession):
+        self.store = store
+        self.session_id = session_id
+        self.messages = list(entry.messages)
+        self.dropped = entry.dropped
+        self.summary = entry.summary
+        self.summarized_until = entry.summarized_until
+
+    @property
+    def max_messages(self) -> int:
+        return self.store.max_messages
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        messages = list(messages)
+        self.store.append(self.session_id, messages)
+        self.messages.extend(messages)
+        overflow = len(self.messages) - self.store.max_messages
+        if overflow > 0:
+            del self.messages[:overflow]
+            self.dropped += overflow
+
+    def update_summary(self, summary: str, summarized_until: int) -> None:
+        self.store.save_summary(self.session_id, summary, summarized_until)
+        self.summary = summary
+        self.summarized_until = summarized_until
+
+    def clear(self) -> None:
+        self.store.clear(self.session_id)
+        self.messages = []
+        self.dropped = 0
+        self.summary = ""
+        self.summarized_until = 0
+
+
+class SQLiteChatHistoryStore:
+    """
+    세션ID → 대화 기록 저장소 (chat_logs.db 공유 → 어느 워커 프로세스든 같은 세션 처리 가능)
+
+    - chat_messages : 세션별 메시지 (seq = 세션 내 순번)
+    - chat_summaries: HistoryWindow 요약 상태
+    - 프로세스 내 LRU 읽기 캐시: 세션의 MAX(seq)/요약 위치가 그대로면 메시지를 다시 읽지 않고,
+      다른 워커가 메시지를 추가했으면 그 이후만 이어서 읽음
+    - DB에 없는 세션은 loader(session_id, limit)로 chat_log에서 가져와 저장 (기존 대화 호환)
+    """
+
+    def __init__(self,
+                 db_path: str = CHAT_LOG_DB_PATH,
+                 max_messages: int = CHAT_SESSION_MAX_MESSAGES,
+                 cache_size: int = CHAT_HISTORY_CACHE_SIZE,
+                 loader: Optional[Callable[[str, int], List[BaseMessage]]] = None):
+        self.db_path = db_path
+        self.max_messages = max_messages
+        self.cache_size = cache_size
+        self.loader = loader
+        self._cache: "OrderedDict[str, _CachedSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # 테이블 생성은 import/생성 시가 아니라 첫 연결 때 한 번 (DatabaseManager와 같은 방식)
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def init_database(self):
+        """스키마를 지금 확인 (평소에는 첫 연결 때 자동으로 확인)"""
+        self._connect()
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, seq)
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_summaries (
+            session_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            summarized_until INTEGER NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 연결 (WAL: 여러 프로세스가 읽는 중에도 쓰기 가능)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not self._schema_ready:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                with self._schema_lock:
+                    if not self._schema_ready:
+                        self._create_tables(conn)
+                        self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    # ---------- 조회 ----------
+    def get(self, session_id: str) -> SQLiteChatMessageHistory:
+        conn = self._connect()
+        # 인덱스(PK) 조회 두 번으로 캐시 유효성 확인
+        max_seq, summarized_until = conn.execute(
+            "SELECT (SELECT MAX(seq) FROM chat_messages WHERE session_id = ?), "
+            "(SELECT summarized_until FROM chat_summaries WHERE session_id = ?)",
+            (session_id, session_id)
+        ).fetchone()
+        next_seq = -1 if max_seq is None else max_seq + 1
+
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                self._cache.move_to_end(session_id)
+
+        if entry is None or next_seq < entry.next_seq:
+            entry = self._load(conn, session_id)
+        else:
+            if next_seq > entry.next_seq:
+                # 다른 워커가 추가한 메시지만 이어서 읽음
+                entry = self._extend(conn, session_id, entry)
+            if (summarized_until or 0) != entry.summarized_until:
+                entry = self._reload_summary(conn, session_id, entry)
+
+        with self._lock:
+            self._remember(session_id, entry)
+            return SQLiteChatMessageHistory(self, session_id, entry)
+
+    def _load(self, conn: sqlite3.Connection, session_id: str) -> _CachedSession:
+        rows = conn.execute(
+            "SELECT seq, type, content FROM chat_messages WHERE session_id = ? "
+            "ORDER BY seq DESC LIMIT ?",
+            (session_id, self.max_messages)
+        ).fetchall()
+        if not rows and self.loader:
+            legacy = self.loader(session_id, self.max_messages)
+            if legacy:
+                self.append(session_id, legacy, only_if_empty=True)
+                return self._load(conn, session_id)
+
+        rows.reverse()
+        dropped = rows[0][0] if rows else 0
+        messages = [_MESSAGE_CLASSES[type_](content=content) for _, type_, content in rows]
+        entry = _CachedSession(messages, dropped, "", 0)
+        return self._reload_summary(conn, session_id, entry)
+
+    def _extend(self, conn: sqlite3.Connection, session_id: str, entry: _CachedSession) -> _CachedSession:
+        rows = conn.execute(
+            "SELECT seq, type, content FROM chat_messages WHERE session_id = ? AND seq >= ? "
+            "ORDER BY seq",
+            (session_id, entry.next_seq)
+        ).fetchall()
+        if rows and rows[0][0] != entry.next_seq:
+            return self._load(conn, session_id)
+        messages = entry.messages + [_MESSAGE_CLASSES[type_](content=content) for _, type_, content in rows]
+        overflow = max(len(messages) - self.max_messages, 0)
+        return _CachedSession(messages[overflow:], entry.dropped + overflow,
+                              entry.summary, entry.summarized_until)
+
+    @staticmethod
+    def _reload_summary(conn: sqlite3.Connection, session_id: str, entry: _CachedSession) -> _CachedSession:
+        row = conn.execute(
+            "SELECT summary, summarized_until FROM chat_summaries WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        summary, summarized_until = row if row else ("", 0)
+        return _CachedSession(entry.messages, entry.dropped, summary, summarized_until)
+
+    def _remember(self, session_id: str, entry: _CachedSession):
+        # self._lock 안에서 호출
+        self._cache[session_id] = entry
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # ---------- 저장 ----------
+    def append(self, session_id: str, messages: Sequence[BaseMessage], only_if_empty: bool = False):
+        """세션 끝에 메시지 추가 (순번은 트랜잭션 안에서 DB 기준으로 매김)"""
+        if not messages:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            max_seq = conn.execute(
+                "SELECT MAX(seq) FROM chat_messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            if only_if_empty and max_seq is not None:
+                conn.execute("ROLLBACK")
+                return
+            start = 0 if max_seq is None else max_seq + 1
+            conn.executemany(
+                "INSERT INTO chat_messages (session_id, seq, type, content) VALUES (?, ?, ?, ?)",
+                [
+                    (session_id, start + i, _message_type(m), m.content if isinstance(m.content, str) else str(m.content))
+                    for i, m in enumerate(messages)
+                ]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None and entry.next_seq == start:
+                merged = entry.messages + list(messages)
+                overflow = max(len(merged) - self.max_messages, 0)
+                self._cache[session_id] = _CachedSession(
+                    merged[overflow:], entry.dropped + overflow, entry.summary, entry.summarized_until
+                )
+            else:
+                # 캐시가 DB보다 뒤처져 있었음 → 다음 get()에서 다시 읽음
+                self._cache.pop(session_id, None)
+
+    def save_summary(self, session_id: str, summary: str, summarized_until: int):
+        conn = self._connect()
+        # 다른 워커가 더 뒤까지 요약해 두었으면 덮어쓰지 않음
+        conn.execute("""
+            INSERT INTO chat_summaries (session_id, summary, summarized_until) VALUES (?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                summary = excluded.summary,
+                summarized_until = excluded.summarized_until,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE excluded.summarized_until > chat_summaries.summarized_until
+        """, (session_id, summary, summarized_until))
+
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None and summarized_until > entry.summarized_until:
+                self._cache[session_id] = _CachedSession(entry.messages, entry.dropped, summary, summarized_until)
+
+    def clear(self, session_id: str):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM chat_summaries WHERE session_id = ?", (session_id,))
+        conn.execute("COMMIT")
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._cache
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def create_session_store(backend: str = CHAT_HISTORY_BACKEND):
+    """CHAT_HISTORY_BACKEND에 맞는 대화 기록 저장소"""
+    if backend == "memory":
+        return SessionStore()
+    if backend == "sqlite":
+        return SQLiteChatHistoryStore()
+    raise ValueError(f"지원하지 않는 CHAT_HISTORY_BACKEND: {backend}")
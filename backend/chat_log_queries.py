@@ -0,0 +1,270 @@
+# backend/chat_log_queries.py
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+CHAT_LOG_DB_PATH = os.path.join(os.path.dirname(__file__), "chat_logs", "chat_logs.db")
+# 세션의 최근 대화 (chatbot_core.load_chat_history, 최신순 → 호출하는 쪽에서 뒤집음)
+SESSION_RECENT_SQL = """
+    SELECT user_input, bot_response FROM chat_log WHERE session_id = ?
+    ORDER BY id DESC LIMIT ?
+"""
+
+
+def _migrate_chat_log_v1(conn: sqlite3.Connection):
+    """
+    기본키 없던 chat_log를 id INTEGER PRIMARY KEY(rowid 별칭)로 재구성
+    + (session_id, timestamp), (timestamp) 인덱스
+    기존 행의 rowid를 id로 그대로 옮기므로 순서가 유지됨
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS chat_log (
+        session_id TEXT,
+        user_input TEXT,
+        bot_response TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE chat_log_v1 (
+        id INTEGER PRIMARY KEY,
+        session_id TEXT,
+        user_input TEXT,
+        bot_response TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    INSERT INTO chat_log_v1 (id, session_id, user_input, bot_response, timestamp)
+    SELECT rowid, session_id, user_input, bot_response, timestamp FROM chat_log ORDER BY rowid
+    """)
+    conn.execute("DROP TABLE chat_log")
+    conn.execute("ALTER TABLE chat_log_v1 RENAME TO chat_log")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_log_session_ts ON chat_log(session_id, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_log_ts ON chat_log(timestamp)")
+
+
+def _migrate_chat_log_v2(conn: sqlite3.Connection):
+    """
+    세션 조회(transcript, 대화 복원)는 id 순이므로 (session_id, timestamp) 대신 (session_id, id) 인덱스
+    → 세션 전체를 임시 B-tree로 정렬하지 않고 인덱스 순서대로 읽음
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_chat_log_session_ts")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_log_session_id ON chat_log(session_id, id)")
+
+
+# (버전, 함수) — 새 스키마 변경은 끝에 추가
+CHAT_LOG_MIGRATIONS = [
+    (1, _migrate_chat_log_v1),
+    (2, _migrate_chat_log_v2),
+]
+# chat_logs.db 스키마 버전 (PRAGMA user_version)
+CHAT_LOG_SCHEMA_VERSION = CHAT_LOG_MIGRATIONS[-1][0]
+
+
+def migrate_chat_log(conn: sqlite3.Connection):
+    """
+    chat_log 스키마 마이그레이션 (PRAGMA user_version 기준, 여러 프로세스가 동시에 불러도 한 번만 실행)
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= CHAT_LOG_SCHEMA_VERSION:
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # 락을 잡은 뒤 다시 확인 (다른 워커가 먼저 끝냈을 수 있음)
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, migrate in CHAT_LOG_MIGRATIONS:
+            if version > current:
+                migrate(conn)
+        conn.execute(f"PRAGMA user_version = {CHAT_LOG_SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+class ChatLogQueries:
+    """
+    chat_log 조회/집계 (전체 스캔 없이)
+
+    - transcript: 세션별 대화, id 커서(keyset) 페이지네이션 ((session_id, id) 인덱스 순서대로)
+    - daily_stats: 날짜(UTC)별 턴 수/세션 수/평균 답변 길이
+      chat_log_daily 집계 테이블에 마지막으로 반영한 id 이후 행만 더해서 갱신
+    """
+
+    def __init__(self, db_path: str = CHAT_LOG_DB_PATH):
+        self.db_path = db_path
+        # 스키마 확인은 import/생성 시가 아니라 첫 조회 때 한 번 (DatabaseManager와 같은 방식)
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self.init_database()
+                    self._schema_ready = True
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_database(self):
+        """집계 테이블 생성 (chat_log는 migrate_chat_log가 관리, 평소에는 첫 조회 때 자동으로 실행)"""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+
+        migrate_chat_log(conn)
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_log_daily (
+                day TEXT PRIMARY KEY,
+                turns INTEGER NOT NULL,
+                sessions INTEGER NOT NULL,
+                user_chars INTEGER NOT NULL,
+                reply_chars INTEGER NOT NULL
+            )
+        ''')
+
+        # 날짜별 세션 수는 합산이 안 되므로 (날짜, 세션) 쌍을 따로 보관
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_log_daily_sessions (
+                day TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                PRIMARY KEY (day, session_id)
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_log_rollup_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_id INTEGER NOT NULL
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    # 조회 SQL (tests/test_query_plans.py가 같은 문자열로 인덱스 사용을 확인)
+    TRANSCRIPT_SQL = '''
+        SELECT id, user_input, bot_response, timestamp
+        FROM chat_log
+        WHERE session_id = ? AND id > ?
+        ORDER BY id
+        LIMIT ?
+    '''
+
+    def transcript(self, session_id: str, limit: int = 50, after: Optional[int] = None) -> Dict:
+        """
+        세션 대화 (오래된 순)
+        반환: {"turns": [...], "next_cursor": 마지막 id | None}
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        # limit+1개로 다음 페이지 유무 확인
+        cursor.execute(self.TRANSCRIPT_SQL, (session_id, after or 0, limit + 1))
+        rows = cursor.fetchall()
+        conn.close()
+
+        turns = [
+            {"id": row[0], "user_input": row[1], "bot_response": row[2], "timestamp": row[3]}
+            for row in rows[:limit]
+        ]
+        next_cursor = turns[-1]["id"] if len(rows) > limit else None
+        return {"turns": turns, "next_cursor": next_cursor}
+
+    def refresh_daily(self) -> int:
+        """마지막 집계 이후 추가된 chat_log 행을 chat_log_daily에 반영 (반영한 행 수)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            # 집계 갱신은 한 프로세스씩 (같은 행을 두 번 더하지 않도록)
+            cursor.execute("BEGIN IMMEDIATE")
+            row = cursor.execute("SELECT last_id FROM chat_log_rollup_state WHERE id = 1").fetchone()
+            last_id = row[0] if row else 0
+
+            new_last_id, count = cursor.execute(
+                "SELECT MAX(id), COUNT(*) FROM chat_log WHERE id > ?", (last_id,)
+            ).fetchone()
+            if not count:
+                conn.rollback()
+                return 0
+
+            cursor.execute('''
+                INSERT OR IGNORE INTO chat_log_daily_sessions (day, session_id)
+                SELECT DISTINCT date(timestamp), session_id FROM chat_log WHERE id > ? AND id <= ?
+            ''', (last_id, new_last_id))
+
+            cursor.execute('''
+                INSERT INTO chat_log_daily (day, turns, sessions, user_chars, reply_chars)
+                SELECT date(timestamp), COUNT(*), 0,
+                       COALESCE(SUM(LENGTH(user_input)), 0), COALESCE(SUM(LENGTH(bot_response)), 0)
+                FROM chat_log
+                WHERE id > ? AND id <= ?
+                GROUP BY date(timestamp)
+                ON CONFLICT(day) DO UPDATE SET
+                    turns = turns + excluded.turns,
+                    user_chars = user_chars + excluded.user_chars,
+                    reply_chars = reply_chars + excluded.reply_chars
+            ''', (last_id, new_last_id))
+
+            # 이번에 바뀐 날짜만 세션 수 다시 계산
+            cursor.execute('''
+                UPDATE chat_log_daily
+                SET sessions = (
+                    SELECT COUNT(*) FROM chat_log_daily_sessions s WHERE s.day = chat_log_daily.day
+                )
+                WHERE day IN (SELECT DISTINCT date(timestamp) FROM chat_log WHERE id > ? AND id <= ?)
+            ''', (last_id, new_last_id))
+
+            cursor.execute('''
+                INSERT INTO chat_log_rollup_state (id, last_id) VALUES (1, ?)
+                ON CONFLICT(id) DO UPDATE SET last_id = excluded.last_id
+            ''', (new_last_id,))
+            conn.commit()
+            return count
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def daily_stats(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict]:
+        """날짜별 집계 (조회 전에 새 행만 증분 반영)"""
+        self.refresh_daily()
+
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        conditions = []
+        params: List = []
+        if date_from:
+            conditions.append("day >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("day <= ?")
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor.execute(f'''
+            SELECT day, turns, sessions, user_chars, reply_chars
+            FROM chat_log_daily {where}
+            ORDER BY day
+        ''', params)
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [
+            {
+                "day": day,
+                "turns": turns,
+                "sessions": sessions,
+                "avg_user_chars": round(user_chars / turns, 1) if turns else 0.0,
+                "avg_reply_chars": round(reply_chars / turns, 1) if turns else 0.0,
+            }
+            for day, turns, sessions, user_chars, reply_chars in rows
+        ]
+
+# 전역 조회 인스턴스
+chat_log_queries = ChatLogQueries()
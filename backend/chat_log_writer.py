@@ -0,0 +1,191 @@
+# backend/chat_log_writer.py
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+try:
+    from .chat_log_queries import migrate_chat_log  # type: ignore
+except ImportError:
+    from chat_log_queries import migrate_chat_log
+
+# 한 트랜잭션에 모아 쓸 최대 행 수
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "100"))
+# 첫 행이 들어온 뒤 이 시간(초)이 지나면 batch_size가 안 차도 기록
+CHAT_LOG_FLUSH_SECONDS = float(os.getenv("CHAT_LOG_FLUSH_SECONDS", "0.5"))
+# 종료(stop) 중 기록에 실패하면 flush_seconds 간격으로 더 시도하는 횟수 (그래도 실패하면 버리고 로그)
+CHAT_LOG_STOP_RETRIES = int(os.getenv("CHAT_LOG_STOP_RETRIES", "3"))
+CHAT_LOG_DB_PATH = os.path.join(os.path.dirname(__file__), "chat_logs", "chat_logs.db")
+
+logger = logging.getLogger(__name__)
+
+Row = Tuple[str, str, str, str]  # (session_id, user_input, bot_response, timestamp)
+
+
+class _FlushRequest:
+    """flush() 대기자: 앞선 행이 기록되면 ok=True로, 기록을 포기하면 ok=False로 깨움"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
+    def finish(self, ok: bool):
+        self.ok = ok
+        self.done.set()
+
+
+class ChatLogWriter:
+    """
+    chat_log 비동기 일괄 기록기
+
+    - enqueue()는 메모리 큐에 넣고 바로 반환 → 대화 응답 지연에 디스크 fsync가 포함되지 않음
+    - 전용 스레드가 자기 연결(WAL)로 batch_size개 또는 flush_seconds마다 한 트랜잭션으로 INSERT
+    - timestamp는 큐에 넣는 시점 값 (기존 DEFAULT CURRENT_TIMESTAMP와 같은 UTC 형식)
+    - 기록에 실패하면(database is locked 등) 행을 버리지 않고 flush_seconds마다 다시 시도
+    - stop()/프로세스 종료(atexit) 시 남은 행을 모두 기록
+      (그때도 실패하면 stop_retries번 더 시도하고, 버린 행 수를 로그로 남기고 flush() 대기자는 False로 깨움)
+    """
+
+    def __init__(self, db_path: str = CHAT_LOG_DB_PATH,
+                 batch_size: int = CHAT_LOG_BATCH_SIZE,
+                 flush_seconds: float = CHAT_LOG_FLUSH_SECONDS,
+                 stop_retries: int = CHAT_LOG_STOP_RETRIES):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.stop_retries = stop_retries
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    # ---------- 수명 주기 ----------
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10):
+        """남은 행을 기록하고 종료"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout=timeout)
+        if thread.is_alive():
+            logger.warning("chat_log 기록기가 %.1f초 안에 끝나지 않았습니다 (기록 안 된 대화가 남아 있을 수 있음)", timeout)
+
+    # ---------- 기록 ----------
+    def enqueue(self, session_id: str, user_input: str, bot_response: str):
+        if self._thread is None:
+            # startup 이벤트 없이 쓰이는 경우(스크립트/테스트 클라이언트 등)
+            self.start()
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self._queue.put((session_id, user_input, bot_response, timestamp))
+
+    def flush(self, timeout: float = 5) -> bool:
+        """
+        지금까지 넣은 행이 모두 기록될 때까지 대기 (chat_log를 바로 읽어야 할 때)
+        timeout 안에 기록하지 못하면(기록 실패 재시도 중 포함) False
+        """
+        if self._thread is None:
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout) and request.ok
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        pending: List[Row] = []
+        waiters: List[_FlushRequest] = []
+        stopping = False
+        try:
+            while not stopping:
+                # 첫 항목은 무한 대기 (기록 실패로 남은 행이 있으면 flush_seconds 뒤 재시도),
+                # 이후는 flush_seconds 안에 들어온 것만 모음
+                timeout = self.flush_seconds if pending else None
+                deadline = None
+                while True:
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                    elif isinstance(item, _FlushRequest):
+                        waiters.append(item)
+                    else:
+                        pending.append(item)
+
+                    if stopping or waiters or len(pending) >= self.batch_size:
+                        break
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_seconds
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+
+                if stopping:
+                    # 종료 신호 뒤에 남은 행까지 모두 기록
+                    while True:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if isinstance(item, _FlushRequest):
+                            waiters.append(item)
+                        elif item is not None:
+                            pending.append(item)
+
+                if pending and not self._write(conn, pending):
+                    if not stopping:
+                        # 기록 전이므로 flush() 대기자는 깨우지 않음 (다음 재시도에서 성공하면 깨움)
+                        continue
+                    if not self._retry_before_stop(conn, pending):
+                        logger.error("chat_log 기록 실패로 종료 전 대화 %d건을 버립니다", len(pending))
+                        for waiter in waiters:
+                            waiter.finish(False)
+                        return
+                pending = []
+                for waiter in waiters:
+                    waiter.finish(True)
+                waiters = []
+        finally:
+            conn.close()
+
+    def _retry_before_stop(self, conn: sqlite3.Connection, rows: List[Row]) -> bool:
+        for _ in range(self.stop_retries):
+            time.sleep(self.flush_seconds)
+            if self._write(conn, rows):
+                return True
+        return False
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, rows: List[Row]) -> bool:
+        """한 트랜잭션으로 기록 (실패하면 다음 배치 때 다시 시도)"""
+        try:
+            # chat_log가 아직 없을 수 있음 (스키마는 import 시가 아니라 첫 사용 때 확인, 최신이면 PRAGMA 조회 한 번)
+            migrate_chat_log(conn)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO chat_log (session_id, user_input, bot_response, timestamp) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+            return True
+        except sqlite3.Error:
+            logger.exception("chat_log 기록 실패 (%d건, 다시 시도 예정)", len(rows))
+            return False
+
+# 전역 기록기 인스턴스 (main.py shutdown 이벤트/atexit에서 종료)
+chat_log_writer = ChatLogWriter()
@@ -1,23 +1,47 @@
 from dotenv import load_dotenv
+import asyncio
+import logging
 import os
+import threading
+import traceback
 
 from langchain_openai import ChatOpenAI
 from langchain.prompts.chat import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate,
+    MessagesPlaceholder,
 )
 from langchain.prompts import FewShotPromptTemplate, PromptTemplate
 from langchain.schema import SystemMessage
-from langchain.memory import ConversationBufferMemory
+from langchain.schema import AIMessage, HumanMessage
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.runnables import ConfigurableFieldSpec, RunnableLambda
 from langchain_core.runnables.history import RunnableWithMessageHistory
 
 import sqlite3
 
+try:
+    from .chat_history import create_session_store, HistoryWindow  # type: ignore
+    from .response_cache import response_cache  # type: ignore
+    from .intent_router import intent_router  # type: ignore
+    from .llm_usage import prompt_cache_stats  # type: ignore
+    from .chat_log_writer import chat_log_writer  # type: ignore
+    from .chat_log_queries import migrate_chat_log, SESSION_RECENT_SQL  # type: ignore
+except ImportError:
+    from chat_history import create_session_store, HistoryWindow
+    from response_cache import response_cache
+    from intent_router import intent_router
+    from llm_usage import prompt_cache_stats
+    from chat_log_writer import chat_log_writer
+    from chat_log_queries import migrate_chat_log, SESSION_RECENT_SQL
+
 
 # ================================================================================================================================================================================
 
 
+logger = logging.getLogger(__name__)
+
 # 환경변수 불러오기
 load_dotenv()
 if not os.getenv("OPENAI_API_KEY"):
@@ -26,7 +50,9 @@ if not os.getenv("OPENAI_API_KEY"):
 # LLM 구성
 llm = ChatOpenAI(
     model="gpt-4o-mini",
-    temperature=0.7
+    temperature=0.7,
+    stream_usage=True,  # 스트리밍 응답에도 usage_metadata 포함
+    callbacks=[prompt_cache_stats],  # 호출별 캐시/비캐시 입력 토큰 집계
 )
 
 # 역할 부여용 시스템 프롬프트
@@ -142,61 +168,244 @@ human_message = HumanMessagePromptTemplate.from_template(
 )
 
 
+# 정적 앞부분(시스템 프롬프트 + few-shot)은 변수가 없으므로 시작 시 한 번만 메시지로 만들어 둠
+# → 매 턴 템플릿 재조립 없음, 매 호출 바이트 단위로 같아서 OpenAI 프롬프트 캐시가 적용됨
+#   (턴마다 달라지는 요약/대화/질문은 반드시 이 뒤에)
+STATIC_PREFIX_MESSAGES = (
+    system_prompt.format(),
+    SystemMessage(content=few_shot.format()),  # user_input 안 쓰니 format()만
+)
+
 # PromptTemplate 구성
 prompt = ChatPromptTemplate.from_messages([
-    system_prompt,
-    SystemMessage(content=few_shot.format()),  # user_input 안 쓰니 format()만
+    *STATIC_PREFIX_MESSAGES,
+    MessagesPlaceholder("summary", optional=True),  # 오래된 대화 요약
+    MessagesPlaceholder("history", optional=True),  # 토큰 예산 안의 최근 대화
     human_message,
 ])
 
 
-memory_store = {}
+# 대화 기록 저장소 (CHAT_HISTORY_BACKEND)
+# - sqlite(기본): chat_logs.db에 저장 + 프로세스 내 LRU 읽기 캐시 → uvicorn 워커 여러 개가 같은 세션 처리
+# - memory: 세션 수/유휴 시간이 제한된 프로세스 내 LRU 저장소 (단일 워커용)
+# 어느 쪽이든 저장소에 없는 세션은 chat_log에서 복원
+memory_store = create_session_store()
 
 def get_session_history(session_id: str):
-    if session_id not in memory_store:
-        memory_store[session_id] = ConversationBufferMemory(return_messages=True)
-    return memory_store[session_id].chat_memory
+    """세션 대화 기록 (저장소/chat_log 조회가 있으므로 비동기 경로에서는 asyncio.to_thread로 호출)"""
+    return memory_store.get(session_id)
+
+def _prefetched_history(history: BaseChatMessageHistory) -> BaseChatMessageHistory:
+    # 체인 안에서는 저장소를 조회하지 않고 호출 전에 불러온 기록을 그대로 사용
+    return history
+
+
+# ----- 긴 대화: 최근 대화는 토큰 예산만큼 원문, 그 이전은 누적 요약 -----
+def _summary_request(summary: str, messages):
+    lines = "\n".join(
+        f"{'보호자' if m.type == 'human' else '챗봇'}: {m.content}" for m in messages
+    )
+    return (
+        "다음은 요양병원 보호자와 감정케어 챗봇의 이전 대화 요약과 이어지는 대화입니다.\n"
+        "보호자의 상황, 감정, 주요 걱정거리를 중심으로 5문장 이내의 한국어 요약으로 갱신하세요.\n\n"
+        f"[기존 요약]\n{summary or '(없음)'}\n\n[이어지는 대화]\n{lines}"
+    )
+
+# 요약 전용 LLM (prompt_cache_stats 콜백 없음 → /chat/prompt-cache-stats는 대화 응답 호출만 집계)
+summary_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
+
+def summarize_history(summary: str, messages) -> str:
+    return summary_llm.invoke(_summary_request(summary, messages)).content
+
+async def asummarize_history(summary: str, messages) -> str:
+    return (await summary_llm.ainvoke(_summary_request(summary, messages))).content
+
+history_window = HistoryWindow(summarize=summarize_history, asummarize=asummarize_history)
+
+def _with_summary(inputs: dict, summary: str, recent) -> dict:
+    summary_messages = [SystemMessage(content=f"이전 대화 요약:\n{summary}")] if summary else []
+    return {**inputs, "summary": summary_messages, "history": recent}
+
+def window_history(inputs: dict, config) -> dict:
+    # LLM/DB 호출 없음 (요약 갱신은 응답 뒤 _update_summary / _schedule_summary)
+    history = config["configurable"]["message_history"]
+    return _with_summary(inputs, *history_window.apply(history))
+
+async def awindow_history(inputs: dict, config) -> dict:
+    return window_history(inputs, config)
 
+# 세션별 진행 중인 요약 작업 (같은 세션을 동시에 두 번 요약하지 않도록, 태스크 참조 유지)
+_summary_tasks = {}
 
+def _update_summary(history):
+    try:
+        history_window.update(history)
+    except Exception:
+        # 요약 실패는 응답에 영향 없음 (다음 턴에 다시 시도)
+        traceback.print_exc()
+
+async def _aupdate_summary(history):
+    try:
+        await history_window.aupdate(history)
+    except Exception:
+        traceback.print_exc()
+
+def _schedule_summary(session_id: str, history):
+    """응답을 보낸 뒤 백그라운드에서 요약 갱신 (요약할 차례일 때만 LLM 호출)"""
+    if session_id in _summary_tasks or history_window.pending(history) is None:
+        return
+    task = asyncio.create_task(_aupdate_summary(history))
+    _summary_tasks[session_id] = task
+    task.add_done_callback(lambda _: _summary_tasks.pop(session_id, None))
+
+
+# config={"configurable": {"history": get_session_history(session_id)}}로 호출
 chat_chain = RunnableWithMessageHistory(
-    prompt | llm,
-    get_session_history=get_session_history,
+    RunnableLambda(window_history, afunc=awindow_history) | prompt | llm,
+    get_session_history=_prefetched_history,
     input_messages_key="user_input",
-    history_messages_key="history"
+    history_messages_key="history",
+    history_factory_config=[
+        ConfigurableFieldSpec(
+            id="history",
+            annotation=BaseChatMessageHistory,
+            name="Session history",
+            description="get_session_history로 미리 불러온 세션 대화 기록",
+            default=None,
+            is_shared=True,
+        ),
+    ],
 )
 
 # ----------------------------------------------------------------------------------------------------------
 
-# DB 초기화
+# DB 초기화 (import 시가 아니라 첫 조회 때 연결)
 db_path = os.path.join(os.path.dirname(__file__), "chat_logs", "chat_logs.db")
-os.makedirs(os.path.dirname(db_path), exist_ok=True)
-
-conn = sqlite3.connect(db_path, check_same_thread=False)
-cursor = conn.cursor()
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS chat_log (
-    session_id TEXT,
-    user_input TEXT,
-    bot_response TEXT,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-)
-""")
-conn.commit()
+conn = None  # _chat_log_connection()이 처음 부를 때 연결
+# 여러 스레드(동기 핸들러 스레드풀 / asyncio.to_thread)가 같은 연결로 읽으므로 직렬화
+db_lock = threading.Lock()
+
+def _chat_log_connection() -> sqlite3.Connection:
+    # db_lock 안에서 호출
+    global conn
+    if conn is None:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        new_conn = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL: chat_log_writer 스레드가 쓰는 동안에도 읽기가 막히지 않음
+        new_conn.execute("PRAGMA journal_mode=WAL")
+        # chat_log 생성/스키마 마이그레이션 (id 기본키 + (session_id, id)/timestamp 인덱스)
+        migrate_chat_log(new_conn)
+        conn = new_conn
+    return conn
 
 def save_chat(session_id, user_input, bot_response):
-    cursor.execute(
-        "INSERT INTO chat_log (session_id, user_input, bot_response) VALUES (?, ?, ?)",
-        (session_id, user_input, bot_response)
-    )
-    conn.commit()
+    # 큐에 넣고 바로 반환 (chat_log_writer 스레드가 모아서 한 트랜잭션으로 기록)
+    chat_log_writer.enqueue(session_id, user_input, bot_response)
+
+def load_chat_history(session_id: str, max_messages: int):
+    """chat_log에서 세션의 최근 대화를 메시지 목록으로 복원"""
+    # 아직 큐에 있는 이 프로세스의 대화도 읽히도록 먼저 기록
+    if not chat_log_writer.flush():
+        # 기록이 밀려 있음 → 이 프로세스의 최근 대화가 빠진 채로 복원될 수 있음
+        logger.warning("대기 중인 chat_log 기록을 쓰지 못했습니다 (session_id=%s, 최근 대화 누락 가능)", session_id)
+    with db_lock:
+        rows = _chat_log_connection().execute(SESSION_RECENT_SQL, (session_id, max_messages // 2)).fetchall()
+
+    messages = []
+    for user_input, bot_response in reversed(rows):
+        messages.append(HumanMessage(content=user_input))
+        messages.append(AIMessage(content=bot_response))
+    return messages
+
+memory_store.loader = load_chat_history
+
+# ----- LLM 없이 응답: 의도 라우터(상태 확인/일정 문의) → 답변 캐시 -----
+def _local_reply(history, user_input: str):
+    """
+    반환: (답변 캐시 저장 가능 여부, LLM 없이 만든 응답 또는 None)
+    - 상태 확인/일정 문의로 확실히 분류되면 시스템 프롬프트의 고정 안내 문구
+    - 이전 대화(또는 요약)가 있으면 답변이 맥락에 따라 달라지므로 답변 캐시를 쓰지 않음
+    """
+    routed = intent_router.route(user_input)
+    if routed is not None:
+        return False, routed["reply"]
+    if history.messages or history.summary:
+        return False, None
+    return True, response_cache.get(user_input)
+
+def _save_local_turn(history, session_id: str, user_input: str, reply: str):
+    # LLM을 거치지 않은 응답도 일반 응답처럼 세션 기록과 chat_log에 남김
+    history.add_messages([HumanMessage(content=user_input), AIMessage(content=reply)])
+    save_chat(session_id, user_input, reply)
 
 def get_emotional_support_response(session_id: str, user_input: str):
+    history = get_session_history(session_id)
+    cacheable, local = _local_reply(history, user_input)
+    if local is not None:
+        _save_local_turn(history, session_id, user_input, local)
+        _update_summary(history)
+        return local
+
     reply = chat_chain.invoke(
         {"user_input": user_input},
-        config={"configurable": {"session_id": session_id}}
+        config={"configurable": {"history": history}}
     )
 
     # ✅ 응답 직후 DB 저장
     save_chat(session_id, user_input, reply.content)
+    if cacheable:
+        response_cache.put(user_input, reply.content)
+    _update_summary(history)
+
+    return reply.content
+
+async def aget_emotional_support_response(session_id: str, user_input: str):
+    """get_emotional_support_response의 비동기 버전 (저장소/DB 조회는 스레드에서 → 이벤트 루프를 막지 않음)"""
+    history = await asyncio.to_thread(get_session_history, session_id)
+    cacheable, local = _local_reply(history, user_input)
+    if local is not None:
+        await asyncio.to_thread(_save_local_turn, history, session_id, user_input, local)
+        _schedule_summary(session_id, history)
+        return local
+
+    reply = await chat_chain.ainvoke(
+        {"user_input": user_input},
+        config={"configurable": {"history": history}}
+    )
+
+    save_chat(session_id, user_input, reply.content)
+    if cacheable:
+        response_cache.put(user_input, reply.content)
+    _schedule_summary(session_id, history)
 
-    return reply.content
\ No newline at end of file
+    return reply.content
+
+async def astream_emotional_support_response(session_id: str, user_input: str):
+    """
+    응답을 토큰 단위로 yield (SSE 스트리밍용)
+    스트림이 끝나면 RunnableWithMessageHistory가 세션 메모리에 전체 응답을 남기고,
+    여기서 chat_log에 전체 응답을 저장
+    LLM 없이 만든 응답(고정 안내/캐시)은 한 번에 yield
+    """
+    history = await asyncio.to_thread(get_session_history, session_id)
+    cacheable, local = _local_reply(history, user_input)
+    if local is not None:
+        await asyncio.to_thread(_save_local_turn, history, session_id, user_input, local)
+        _schedule_summary(session_id, history)
+        yield local
+        return
+
+    chunks = []
+    async for chunk in chat_chain.astream(
+        {"user_input": user_input},
+        config={"configurable": {"history": history}}
+    ):
+        if chunk.content:
+            chunks.append(chunk.content)
+            yield chunk.content
+
+    reply = "".join(chunks)
+    save_chat(session_id, user_input, reply)
+    if cacheable:
+        response_cache.put(user_input, reply)
+    _schedule_summary(session_id, history)
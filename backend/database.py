@@ -1,22 +1,134 @@
 # backend/database.py
 import sqlite3
 import os
-from typing import List, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
+# SQLite 연결 튜닝 (연결마다 한 번 적용)
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "8192"))   # 페이지 캐시 (KiB)
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))  # 메모리 맵 읽기 (bytes)
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))    # 쓰기 락 대기 (초)
+SQLITE_CACHED_STATEMENTS = 256  # 연결별 prepared statement 캐시 크기
+
+# /my-patients 결과 캐시
+USER_PATIENTS_CACHE_TTL = float(os.getenv("USER_PATIENTS_CACHE_TTL", "300"))  # 항목 유효 시간 (초)
+USER_PATIENTS_CACHE_MAX = int(os.getenv("USER_PATIENTS_CACHE_MAX", "10000"))  # 최대 사용자 수
+# 다른 프로세스(다른 워커, modify_db.py)의 변경을 확인하는 주기 (초). 그 사이에는 DB를 보지 않음
+USER_PATIENTS_VERSION_CHECK_SECONDS = float(os.getenv("USER_PATIENTS_VERSION_CHECK_SECONDS", "1"))
+
+# 샘플 환자/보호자 데이터 삽입 여부 (개발용, 기본 꺼짐)
+CAREBOT_SEED_DATA = os.getenv("CAREBOT_SEED_DATA", "false").lower() == "true"
+
 class DatabaseManager:
+    """
+    carebot.db 접근 계층
+    스레드마다 연결 하나를 만들어 재사용 (메서드마다 connect/close 하지 않음)
+    - 생성 시에는 DB를 열지 않고, 프로세스에서 처음 연결할 때 스키마 마이그레이션 확인
+    - WAL + synchronous=NORMAL: 읽기가 쓰기를 기다리지 않고, 커밋마다 fsync 하지 않음
+    - 같은 SQL 문자열은 연결의 statement 캐시에서 재사용되므로 쿼리는 고정 문자열 + 파라미터로 작성
+    """
+
     def __init__(self, db_path: str = "database/carebot.db"):
         self.db_path = db_path
-        self.init_database()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        
+        # 사용자별 환자 목록 캐시: user_email → (data_version, 만료 시각, 환자 목록)
+        self._patients_cache: "OrderedDict[str, Tuple[int, float, List[Dict]]]" = OrderedDict()
+        self._patients_cache_lock = threading.Lock()
+        self._patients_version = (-1, 0.0)  # (마지막으로 본 버전, 확인 시각)
+        self._patients_cache_counters = {"hits": 0, "misses": 0, "invalidations": 0}
+        
+        # 프로세스별 스키마 확인 여부 (init_database는 첫 연결 때 한 번)
+        self._schema_pid: Optional[int] = None
+        self._schema_lock = threading.Lock()
     
-    def init_database(self):
-        """데이터베이스 초기화 및 테이블 생성"""
-        # 데이터베이스 디렉토리 생성
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+    def _connect(self) -> sqlite3.Connection:
+        """현재 스레드의 연결 (없으면 생성)"""
+        conn = getattr(self._local, "conn", None)
+        # fork된 자식 프로세스는 부모 연결을 쓰면 안 됨
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        if self._schema_pid != os.getpid():
+            # 데이터베이스 디렉토리 생성
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=SQLITE_BUSY_TIMEOUT,
+            cached_statements=SQLITE_CACHED_STATEMENTS,
+            check_same_thread=False,  # close_all()에서 다른 스레드가 닫을 수 있도록 (사용은 스레드별)
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
         
+        if self._schema_pid != os.getpid():
+            with self._schema_lock:
+                if self._schema_pid != os.getpid():
+                    try:
+                        self._migrate(conn)
+                    except Exception:
+                        conn.close()
+                        raise
+                    self._schema_pid = os.getpid()
+        
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+    
+    def close_all(self):
+        """모든 스레드의 연결 닫기 (종료 시)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
+    def init_database(self):
+        """스키마를 지금 확인 (평소에는 프로세스의 첫 연결 때 자동으로 확인)"""
+        self._connect()
+    
+    def _migrate(self, conn: sqlite3.Connection):
+        """
+        스키마 마이그레이션 (PRAGMA user_version = 적용된 마지막 버전)
+        최신이면 PRAGMA 조회 한 번으로 끝나고 DDL은 실행하지 않음
+        여러 워커가 동시에 시작해도 BEGIN IMMEDIATE로 한 프로세스만 적용
+        """
+        latest = self.MIGRATIONS[-1][0]
+        if conn.execute("PRAGMA user_version").fetchone()[0] < latest:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                # 락을 잡은 뒤 다시 확인 (다른 워커가 먼저 끝냈을 수 있음)
+                current = cursor.execute("PRAGMA user_version").fetchone()[0]
+                for version, name in self.MIGRATIONS:
+                    if version > current:
+                        getattr(self, name)(cursor)
+                cursor.execute(f"PRAGMA user_version = {latest}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        if CAREBOT_SEED_DATA:
+            self.insert_initial_data(conn)
+    
+    # 마이그레이션은 user_version 0인 기존 DB에도 안전하도록 모두 IF NOT EXISTS
+    @staticmethod
+    def _migrate_v1(cursor):
+        """사용자-환자 연결 / 환자 / 피드백"""
         # 사용자-환자 연결 테이블
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_patient_relations (
@@ -53,16 +165,120 @@ class DatabaseManager:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+    
+    @staticmethod
+    def _migrate_v2(cursor):
+        """간호기록 파싱 결과"""
+        # 간호기록 파싱 결과 (parse_by_date 레코드)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS nursing_notes (
+                patient_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                label TEXT NOT NULL,
+                block TEXT NOT NULL,
+                seq INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (patient_id, date, label)
+            )
+        ''')
+        # 라벨별 조회 (예: 특정 환자의 '수면' 기록 기간 조회)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_nursing_notes_label
+            ON nursing_notes (patient_id, label, date)
+        ''')
         
-        conn.commit()
-        conn.close()
+        # 간호기록 날짜 (특이사항이 없는 날짜 포함)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS nursing_note_dates (
+                patient_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                PRIMARY KEY (patient_id, date)
+            )
+        ''')
         
-        # 초기 데이터 삽입 (테스트용)
-        self.insert_initial_data()
+        # 환자별 간호기록을 만든 PDF 버전 (내용 해시)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS nursing_note_sources (
+                patient_id TEXT PRIMARY KEY,
+                sha256 TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
     
-    def insert_initial_data(self):
-        """초기 테스트 데이터 삽입"""
-        conn = sqlite3.connect(self.db_path)
+    @staticmethod
+    def _migrate_v3(cursor):
+        """간호기록 PDF 레지스트리"""
+        # 환자별 간호기록 PDF 등록 (버전 관리)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS patient_documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                is_current INTEGER NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(patient_id, version)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_patient_documents_path
+            ON patient_documents (path, is_current)
+        ''')
+    
+    @staticmethod
+    def _migrate_v4(cursor):
+        """/my-patients 캐시 무효화 버전 카운터"""
+        # 캐시 무효화용 버전 카운터 (트리거가 올림 → 다른 프로세스/직접 SQL 변경도 감지)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('user_patients', 0)")
+        # 사용자-환자 연결/환자 정보가 바뀌면 user_patients 버전 증가
+        for table in ("user_patient_relations", "patients"):
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE cache_versions SET version = version + 1 WHERE name = 'user_patients';
+                    END
+                ''')
+    
+    @staticmethod
+    def _migrate_v5(cursor):
+        """/my-patients, 피드백 조회용 인덱스"""
+        # get_user_patients: user_email로 찾고 created_at 순 정렬, 조회 컬럼까지 포함(covering)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_patient_relations_user_created
+            ON user_patient_relations (user_email, created_at, patient_id, patient_name, relationship)
+        ''')
+        # 피드백 최신순 페이지: 전체 / 사용자별 ((created_at, rowid) 순서 = ORDER BY created_at, id)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_feedback_created
+            ON feedback (created_at)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_feedback_user_created
+            ON feedback (user_email, created_at)
+        ''')
+    
+    # (버전, 메서드) — 새 스키마 변경은 끝에 추가
+    MIGRATIONS = [
+        (1, "_migrate_v1"),
+        (2, "_migrate_v2"),
+        (3, "_migrate_v3"),
+        (4, "_migrate_v4"),
+        (5, "_migrate_v5"),
+    ]
+    
+    def insert_initial_data(self, conn: sqlite3.Connection = None):
+        """초기 테스트 데이터 삽입 (CAREBOT_SEED_DATA=true일 때만)"""
+        conn = conn or self._connect()
         cursor = conn.cursor()
         
         # ===== 여기서 샘플 데이터를 수정할 수 있습니다 =====
@@ -115,24 +331,48 @@ class DatabaseManager:
         # ''', ("25-0000035", "장영희", "1942-05-15", "304", "2024-02-15"))
         
         conn.commit()
-        conn.close()
+    
+    # 조회 SQL (tests/test_query_plans.py가 같은 문자열로 EXPLAIN QUERY PLAN 인덱스 사용을 확인)
+    USER_PATIENTS_SQL = '''
+        SELECT upr.patient_id, upr.patient_name, upr.relationship, 
+               p.birth_date, p.room_number, p.admission_date
+        FROM user_patient_relations upr
+        LEFT JOIN patients p ON upr.patient_id = p.patient_id
+        WHERE upr.user_email = ?
+        ORDER BY upr.created_at DESC
+    '''
     
     def get_user_patients(self, user_email: str) -> List[Dict]:
-        """사용자의 환자 목록 조회"""
-        conn = sqlite3.connect(self.db_path)
+        """
+        사용자의 환자 목록 조회 (read-through 캐시)
+        TTL 안이고 user_patients 버전이 그대로면 DB를 읽지 않음
+        """
+        version = self._user_patients_version()
+        now = time.monotonic()
+        with self._patients_cache_lock:
+            entry = self._patients_cache.get(user_email)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                self._patients_cache.move_to_end(user_email)
+                self._patients_cache_counters["hits"] += 1
+                return [dict(p) for p in entry[2]]
+            self._patients_cache_counters["misses"] += 1
+        
+        patients = self._query_user_patients(user_email)
+        
+        with self._patients_cache_lock:
+            self._patients_cache[user_email] = (version, now + USER_PATIENTS_CACHE_TTL, patients)
+            self._patients_cache.move_to_end(user_email)
+            while len(self._patients_cache) > USER_PATIENTS_CACHE_MAX:
+                self._patients_cache.popitem(last=False)
+        return [dict(p) for p in patients]
+    
+    def _query_user_patients(self, user_email: str) -> List[Dict]:
+        conn = self._connect()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT upr.patient_id, upr.patient_name, upr.relationship, 
-                   p.birth_date, p.room_number, p.admission_date
-            FROM user_patient_relations upr
-            LEFT JOIN patients p ON upr.patient_id = p.patient_id
-            WHERE upr.user_email = ?
-            ORDER BY upr.created_at DESC
-        ''', (user_email,))
+        cursor.execute(self.USER_PATIENTS_SQL, (user_email,))
         
         rows = cursor.fetchall()
-        conn.close()
         
         patients = []
         for row in rows:
@@ -147,74 +387,381 @@ class DatabaseManager:
         
         return patients
     
+    def _user_patients_version(self) -> int:
+        """cache_versions의 user_patients 버전 (USER_PATIENTS_VERSION_CHECK_SECONDS마다 한 번만 조회)"""
+        version, checked_at = self._patients_version
+        now = time.monotonic()
+        if now - checked_at < USER_PATIENTS_VERSION_CHECK_SECONDS:
+            return version
+        
+        row = self._connect().execute(
+            "SELECT version FROM cache_versions WHERE name = 'user_patients'"
+        ).fetchone()
+        version = row[0] if row else 0
+        self._patients_version = (version, now)
+        return version
+    
+    def invalidate_user_patients(self, user_email: str = None):
+        """환자 목록 캐시 무효화 (user_email이 없으면 전체) + 다음 조회 때 버전 다시 확인"""
+        with self._patients_cache_lock:
+            if user_email is None:
+                self._patients_cache.clear()
+            else:
+                self._patients_cache.pop(user_email, None)
+            self._patients_version = (-1, 0.0)
+            self._patients_cache_counters["invalidations"] += 1
+    
+    def user_patients_cache_stats(self) -> Dict:
+        with self._patients_cache_lock:
+            counters = dict(self._patients_cache_counters)
+            size = len(self._patients_cache)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "size": size,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+    
     def add_user_patient(self, user_email: str, patient_id: str, patient_name: str, relationship: str = None):
         """사용자-환자 연결 추가"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                INSERT INTO user_patient_relations (user_email, patient_id, patient_name, relationship)
-                VALUES (?, ?, ?, ?)
-            ''', (user_email, patient_id, patient_name, relationship))
-            
-            conn.commit()
+            # with conn: 성공하면 commit, 예외면 rollback (연결을 재사용하므로 트랜잭션을 남기지 않음)
+            with conn:
+                cursor.execute('''
+                    INSERT INTO user_patient_relations (user_email, patient_id, patient_name, relationship)
+                    VALUES (?, ?, ?, ?)
+                ''', (user_email, patient_id, patient_name, relationship))
+            # 이 프로세스는 바로 반영 (다른 프로세스는 트리거가 올린 버전으로 감지)
+            self.invalidate_user_patients(user_email)
             return True
         except sqlite3.IntegrityError:
             # 이미 존재하는 연결
             return False
-        finally:
-            conn.close()
     
     def save_feedback(self, user_email: str, rating: int, comment: str, timestamp: str):
         """피드백 저장"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO feedback (user_email, rating, comment, timestamp)
-            VALUES (?, ?, ?, ?)
-        ''', (user_email, rating, comment, timestamp))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            cursor.execute('''
+                INSERT INTO feedback (user_email, rating, comment, timestamp)
+                VALUES (?, ?, ?, ?)
+            ''', (user_email, rating, comment, timestamp))
         
         return cursor.lastrowid
     
-    def get_feedback(self, user_email: str = None) -> List[Dict]:
-        """피드백 조회 (특정 사용자 또는 전체)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+    @staticmethod
+    def _feedback_conditions(user_email: str = None, rating: int = None, min_rating: int = None,
+                             date_from: str = None, date_to: str = None) -> Tuple[List[str], List]:
+        """피드백 필터 → (WHERE 조건 목록, 파라미터). 날짜는 created_at(UTC) 기준 YYYY-MM-DD, 양끝 포함"""
+        conditions: List[str] = []
+        params: List = []
         if user_email:
-            cursor.execute('''
-                SELECT id, user_email, rating, comment, timestamp, created_at
-                FROM feedback
-                WHERE user_email = ?
-                ORDER BY created_at DESC
-            ''', (user_email,))
-        else:
-            cursor.execute('''
-                SELECT id, user_email, rating, comment, timestamp, created_at
-                FROM feedback
-                ORDER BY created_at DESC
-            ''')
+            conditions.append("user_email = ?")
+            params.append(user_email)
+        if rating is not None:
+            conditions.append("rating = ?")
+            params.append(rating)
+        if min_rating is not None:
+            conditions.append("rating >= ?")
+            params.append(min_rating)
+        if date_from:
+            conditions.append("created_at >= ?")
+            params.append(date_from)
+        if date_to:
+            # 'YYYY-MM-DD hh:mm:ss' < 다음 날 → 그날 전체 포함
+            conditions.append("created_at < date(?, '+1 day')")
+            params.append(date_to)
+        return conditions, params
+    
+    @classmethod
+    def feedback_page_query(cls, limit: int = 50, after: Tuple[str, int] = None,
+                            **filters) -> Tuple[str, List]:
+        """get_feedback_page가 실행하는 (SQL, 파라미터) (tests/test_query_plans.py가 인덱스 사용 확인)"""
+        conditions, params = cls._feedback_conditions(**filters)
+        if after:
+            # 인덱스 (created_at, rowid) 순서 그대로 이어서 읽음 → 비용이 페이지 크기에 비례
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        # limit+1개로 다음 페이지 유무 확인
+        sql = f'''
+            SELECT id, user_email, rating, comment, timestamp, created_at
+            FROM feedback
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        '''
+        return sql, params + [limit + 1]
+    
+    def get_feedback_page(self, limit: int = 50, after: Tuple[str, int] = None,
+                          **filters) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+        """
+        피드백 최신순 페이지 조회 ((created_at, id) 키셋 페이지네이션)
+        after: 이전 페이지 마지막 항목의 (created_at, id)
+        filters: user_email / rating / min_rating / date_from / date_to
+        반환: (피드백 목록, 다음 커서 또는 None)
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
         
+        cursor.execute(*self.feedback_page_query(limit=limit, after=after, **filters))
         rows = cursor.fetchall()
-        conn.close()
         
-        feedback = []
-        for row in rows:
-            feedback.append({
+        feedback = [
+            {
                 "id": row[0],
                 "user_email": row[1],
                 "rating": row[2],
                 "comment": row[3],
                 "timestamp": row[4],
                 "created_at": row[5]
-            })
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = (feedback[-1]["created_at"], feedback[-1]["id"]) if len(rows) > limit else None
+        return feedback, next_cursor
+    
+    def get_feedback_summary(self, **filters) -> Dict:
+        """피드백 집계 (개수 / 평균 별점 / 별점별 개수), SQL에서 계산"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        conditions, params = self._feedback_conditions(**filters)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        cursor.execute(f'''
+            SELECT rating, COUNT(*)
+            FROM feedback
+            {where}
+            GROUP BY rating
+        ''', params)
+        histogram = {str(rating): 0 for rating in range(1, 6)}
+        for rating, count in cursor.fetchall():
+            histogram[str(rating)] = count
+        
+        count = sum(histogram.values())
+        total = sum(int(rating) * n for rating, n in histogram.items())
+        return {
+            "count": count,
+            "avg_rating": round(total / count, 2) if count else None,
+            "histogram": histogram,
+        }
+
+    def upsert_nursing_notes(self, patient_id: str, by_date: Dict[str, List[Tuple[str, str]]],
+                             source_sha256: str = None) -> int:
+        """
+        간호기록 레코드 일괄 저장 (parse_by_date 결과)
+        by_date에 포함된 날짜는 통째로 교체
+        source_sha256이 이전과 같으면 나머지 날짜는 유지,
+        다르면(문서가 새 버전으로 바뀜) by_date에 없는 날짜는 삭제
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        dates = [(patient_id, date) for date in by_date]
+        rows = [
+            (patient_id, date, label, block, seq)
+            for date, items in by_date.items()
+            for seq, (label, block) in enumerate(items)
+        ]
+        
+        with conn:
+            # 이전 소스 확인부터 교체까지 한 트랜잭션 (다른 프로세스의 저장과 섞이지 않도록)
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                "SELECT sha256 FROM nursing_note_sources WHERE patient_id = ?", (patient_id,)
+            )
+            row = cursor.fetchone()
+            if source_sha256 is not None and (row[0] if row else None) != source_sha256:
+                cursor.execute('''
+                    SELECT date FROM nursing_note_dates WHERE patient_id = ?
+                    UNION
+                    SELECT date FROM nursing_notes WHERE patient_id = ?
+                ''', (patient_id, patient_id))
+                stale = [(patient_id, date) for (date,) in cursor.fetchall() if date not in by_date]
+                cursor.executemany(
+                    "DELETE FROM nursing_notes WHERE patient_id = ? AND date = ?", stale
+                )
+                cursor.executemany(
+                    "DELETE FROM nursing_note_dates WHERE patient_id = ? AND date = ?", stale
+                )
+            
+            cursor.executemany(
+                "DELETE FROM nursing_notes WHERE patient_id = ? AND date = ?", dates
+            )
+            cursor.executemany('''
+                INSERT OR REPLACE INTO nursing_notes (patient_id, date, label, block, seq)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            cursor.executemany(
+                "INSERT OR IGNORE INTO nursing_note_dates (patient_id, date) VALUES (?, ?)", dates
+            )
+            cursor.execute('''
+                INSERT OR REPLACE INTO nursing_note_sources (patient_id, sha256, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (patient_id, source_sha256))
+        
+        return len(rows)
+    
+    def get_nursing_notes(self, patient_id: str, date_from: str = None, date_to: str = None,
+                          label: str = None, limit: int = None,
+                          after: str = None) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        간호기록 조회 (날짜 범위/라벨 필터, 날짜 단위 페이지네이션)
+        limit: 최대 날짜 수, after: 이 날짜 이후부터 (커서)
+        반환 형식은 parse_by_date와 같음: {date: [(label, block), ...]}
+        라벨 필터가 없으면 특이사항이 없는 날짜도 빈 목록으로 포함
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        conditions = ["patient_id = ?"]
+        params: List = [patient_id]
+        if date_from:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("date <= ?")
+            params.append(date_to)
+        if after:
+            conditions.append("date > ?")
+            params.append(after)
+        if label:
+            conditions.append("label = ?")
+            params.append(label)
+        where = " AND ".join(conditions)
+        limit_sql = " LIMIT ?" if limit else ""
+        limit_params = [limit] if limit else []
+        
+        # 1) 창(window)에 들어갈 날짜만 먼저 인덱스로 잘라냄
+        if label:
+            cursor.execute(
+                f"SELECT DISTINCT date FROM nursing_notes WHERE {where} ORDER BY date{limit_sql}",
+                params + limit_params
+            )
+        else:
+            cursor.execute(
+                f"SELECT date FROM nursing_note_dates WHERE {where} ORDER BY date{limit_sql}",
+                params + limit_params
+            )
+        records: Dict[str, List[Tuple[str, str]]] = {row[0]: [] for row in cursor.fetchall()}
+        if not records:
+            return records
+        
+        # 2) 그 날짜 구간의 레코드만 읽음
+        dates = list(records)
+        note_params = [patient_id, dates[0], dates[-1]] + ([label] if label else [])
+        cursor.execute(f'''
+            SELECT date, label, block
+            FROM nursing_notes
+            WHERE patient_id = ? AND date BETWEEN ? AND ?{" AND label = ?" if label else ""}
+            ORDER BY date, seq
+        ''', note_params)
+        
+        for date, row_label, block in cursor.fetchall():
+            records[date].append((row_label, block))
+        
+        return records
+    
+    def get_nursing_notes_source(self, patient_id: str) -> Optional[str]:
+        """환자 간호기록을 만든 PDF 내용 해시 (저장된 적 없으면 None)"""
+        conn = self._connect()
+        cursor = conn.cursor()
         
-        return feedback
+        cursor.execute(
+            "SELECT sha256 FROM nursing_note_sources WHERE patient_id = ?", (patient_id,)
+        )
+        row = cursor.fetchone()
+        
+        return row[0] if row else None
+
+    def register_patient_document(self, patient_id: str, path: str, size: int,
+                                  mtime_ns: int, sha256: str) -> Dict:
+        """
+        환자 PDF 등록
+        현재 버전과 경로/내용이 같으면 size/mtime만 갱신, 다르면 새 버전으로 추가
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        with conn:
+            # 현재 버전 확인부터 새 버전 추가까지 한 트랜잭션
+            # (같은 변경을 감지한 다른 워커가 같은 version을 넣지 않도록 먼저 쓰기 락을 잡음)
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute('''
+                SELECT id, version, path, sha256 FROM patient_documents
+                WHERE patient_id = ? AND is_current = 1
+            ''', (patient_id,))
+            current = cursor.fetchone()
+            
+            if current and current[2] == path and current[3] == sha256:
+                cursor.execute(
+                    "UPDATE patient_documents SET size = ?, mtime_ns = ? WHERE id = ?",
+                    (size, mtime_ns, current[0])
+                )
+            else:
+                cursor.execute(
+                    "UPDATE patient_documents SET is_current = 0 WHERE patient_id = ? AND is_current = 1",
+                    (patient_id,)
+                )
+                cursor.execute('''
+                    INSERT INTO patient_documents (patient_id, version, path, size, mtime_ns, sha256)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (patient_id, (current[1] if current else 0) + 1, path, size, mtime_ns, sha256))
+        
+        return self.get_patient_document(patient_id)
+    
+    def get_patient_document(self, patient_id: str) -> Optional[Dict]:
+        """환자의 현재 PDF 버전 조회"""
+        docs = self._query_patient_documents(
+            "WHERE patient_id = ? AND is_current = 1", (patient_id,)
+        )
+        return docs[0] if docs else None
+    
+    def get_patient_document_by_path(self, path: str) -> Optional[Dict]:
+        """경로로 현재 PDF 버전 조회 (PDF → 환자 역매핑)"""
+        docs = self._query_patient_documents(
+            "WHERE path = ? AND is_current = 1", (path,)
+        )
+        return docs[0] if docs else None
+    
+    def list_patient_documents(self, patient_id: str) -> List[Dict]:
+        """환자의 PDF 전체 버전 (최신순)"""
+        return self._query_patient_documents(
+            "WHERE patient_id = ? ORDER BY version DESC", (patient_id,)
+        )
+    
+    def _query_patient_documents(self, where: str, params: tuple) -> List[Dict]:
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT patient_id, version, path, size, mtime_ns, sha256, is_current, created_at
+            FROM patient_documents
+            {where}
+        ''', params)
+        
+        rows = cursor.fetchall()
+        
+        return [
+            {
+                "patient_id": row[0],
+                "version": row[1],
+                "path": row[2],
+                "size": row[3],
+                "mtime_ns": row[4],
+                "sha256": row[5],
+                "is_current": bool(row[6]),
+                "created_at": row[7]
+            }
+            for row in rows
+        ]
 
 # 전역 데이터베이스 매니저 인스턴스
 db_manager = DatabaseManager()
@@ -0,0 +1,85 @@
+# backend/document_registry.py
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    from .database import db_manager, DatabaseManager  # type: ignore
+except ImportError:
+    from database import db_manager, DatabaseManager
+
+# 등록된 파일을 다시 stat 해 보는 주기(초). 그 사이에는 메모리 캐시만 봄
+REGISTRY_STAT_TTL = float(os.getenv("REGISTRY_STAT_TTL", "30"))
+
+
+class PatientDocumentRegistry:
+    """
+    환자ID → 간호기록 PDF(현재 버전) 레지스트리
+
+    - 원본은 carebot.db patient_documents 테이블 (버전/크기/mtime/sha256)
+    - 조회는 프로세스 내 dict 캐시(read-through) → O(1)
+    - 파일 stat은 REGISTRY_STAT_TTL마다 한 번만, 바뀌었으면 새 버전으로 재등록
+    """
+
+    def __init__(self, db: DatabaseManager, stat_ttl: float = REGISTRY_STAT_TTL):
+        self.db = db
+        self.stat_ttl = stat_ttl
+        self._cache: Dict[str, Dict] = {}  # patient_id → 문서 정보 + checked_at
+        self._lock = threading.Lock()
+
+    def resolve(self, patient_id: str, revalidate: bool = False) -> Optional[Dict]:
+        """
+        환자의 현재 PDF 조회 (등록된 적 없으면 None)
+        등록된 파일이 사라졌으면 FileNotFoundError
+        """
+        doc = self._cache.get(patient_id)
+        if doc is not None and not revalidate and time.monotonic() - doc["checked_at"] < self.stat_ttl:
+            return doc
+
+        # 다른 워커 프로세스의 등록도 반영되도록 DB에서 다시 읽고 파일과 비교
+        doc = self.db.get_patient_document(patient_id)
+        if doc is None:
+            with self._lock:
+                self._cache.pop(patient_id, None)
+            return None
+
+        st = os.stat(doc["path"])
+        if (st.st_size, st.st_mtime_ns) != (doc["size"], doc["mtime_ns"]):
+            return self.register(patient_id, doc["path"])
+        return self._remember(doc)
+
+    def register(self, patient_id: str, pdf_path: str) -> Dict:
+        """PDF 등록 (내용이 바뀌었으면 새 버전)"""
+        path = os.path.abspath(pdf_path)
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+
+        doc = self.db.register_patient_document(patient_id, path, st.st_size, st.st_mtime_ns, sha256)
+        return self._remember(doc)
+
+    def patient_for_path(self, pdf_path: str) -> Optional[str]:
+        """PDF 경로 → 환자ID"""
+        path = os.path.abspath(pdf_path)
+        for patient_id, doc in list(self._cache.items()):
+            if doc["path"] == path:
+                return patient_id
+        doc = self.db.get_patient_document_by_path(path)
+        return doc["patient_id"] if doc else None
+
+    def seed(self, patient_pdfs: Dict[str, str]):
+        """아직 등록되지 않은 환자만 초기 매핑으로 등록"""
+        for patient_id, pdf_path in patient_pdfs.items():
+            if self.db.get_patient_document(patient_id) is None and os.path.exists(pdf_path):
+                self.register(patient_id, pdf_path)
+
+    def _remember(self, doc: Dict) -> Dict:
+        doc = dict(doc, checked_at=time.monotonic())
+        with self._lock:
+            self._cache[doc["patient_id"]] = doc
+        return doc
+
+# 전역 레지스트리 인스턴스
+document_registry = PatientDocumentRegistry(db_manager)
@@ -0,0 +1,303 @@
+# backend/ingest_worker.py
+import asyncio
+import glob
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import IO, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: 파일 락 없이 감시 (단일 워커 실행만 가정)
+    fcntl = None
+
+try:
+    from .ocr_cache import nursing_notes_cache  # type: ignore
+    from .database import db_manager  # type: ignore
+except ImportError:
+    from ocr_cache import nursing_notes_cache
+    from database import db_manager
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_WATCH = os.getenv("INGEST_WATCH", "true").lower() == "true"
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "10"))
+# 끝난 작업을 GET /ingest/jobs/{job_id}로 조회할 수 있는 시간(초), 이후 목록에서 제거
+INGEST_JOB_TTL = float(os.getenv("INGEST_JOB_TTL", "3600"))
+# 워커 프로세스가 죽어 풀이 깨졌을 때 같은 작업을 다시 시도하는 횟수
+INGEST_RETRIES = int(os.getenv("INGEST_RETRIES", "1"))
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+# uvicorn --workers N이어도 감시 폴더는 이 락을 쥔 프로세스 하나만 훑음
+INGEST_WATCH_LOCK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "ingest_watch.lock")
+
+
+def _ingest_pdf(pdf_path: str, patient_id: Optional[str] = None) -> Dict:
+    """
+    워커 프로세스에서 실행: 파싱 후 캐시 DB에 저장
+    (캐시가 경로/해시/증분 상태를 모두 처리하므로 그대로 위임)
+    환자 ID를 알면 carebot.db nursing_notes 테이블에도 저장
+    """
+    parsed = nursing_notes_cache.get_or_build(pdf_path)
+    summary = {"dates": len(parsed["by_date"]), "notes": len(parsed["notes"])}
+
+    if patient_id:
+        # 빌드에 쓴 내용 해시 그대로 (파일을 다시 stat 하면 그 사이 바뀌었을 때 None이 될 수 있음)
+        sha256 = parsed["sha256"]
+        if db_manager.get_nursing_notes_source(patient_id) != sha256:
+            summary["rows"] = db_manager.upsert_nursing_notes(patient_id, parsed["by_date"], sha256)
+    return summary
+
+
+class IngestionWorker:
+    """
+    간호기록 PDF 백그라운드 수집기
+
+    - submit()으로 받은 작업을 큐에 쌓고, 디스패처 스레드가 프로세스 풀로 넘김
+    - 파싱 결과는 nursing_notes_cache(SQLite)에 저장되어 요청 핸들러는 조회만 함
+    - watch_dir를 주기적으로 훑어서 새로 올라오거나 바뀐 PDF를 미리 파싱
+    - patient_resolver(pdf_path) → 환자 ID: 감시 폴더에서 찾은 파일의 환자 매핑
+    - 워커 프로세스가 죽어 풀이 깨지면(BrokenProcessPool) 새 풀을 만들어 작업을 다시 제출
+    - 끝난 작업은 job_ttl초 뒤 목록에서 제거
+    - 감시는 watch_lock 파일 락을 쥔 프로세스 하나만 (쥔 프로세스가 죽으면 다른 프로세스가 이어받음)
+    """
+
+    def __init__(self, max_workers: int = INGEST_WORKERS, watch_dir: Optional[str] = None,
+                 poll_seconds: float = INGEST_POLL_SECONDS,
+                 patient_resolver: Optional[Callable[[str], Optional[str]]] = None,
+                 job_ttl: float = INGEST_JOB_TTL,
+                 watch_lock: str = INGEST_WATCH_LOCK):
+        self.max_workers = max_workers
+        self.watch_dir = watch_dir
+        self.poll_seconds = poll_seconds
+        self.patient_resolver = patient_resolver
+        self.job_ttl = job_ttl
+        self.watch_lock = watch_lock
+
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._jobs: Dict[str, Dict] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()  # 끝난 job_id → 끝난 시각(monotonic), 끝난 순서
+        self._active: Dict[str, str] = {}  # pdf_path → 대기/실행 중인 job_id
+        self._done = threading.Condition()
+        self._seen: Dict[str, Tuple[int, int]] = {}  # 감시 폴더 파일 → (mtime_ns, size)
+        self._stop = threading.Event()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._watch_lock_file: Optional[IO] = None
+        self._threads = []
+
+    # ---------- 수명 주기 ----------
+    def start(self):
+        if self._pool is not None:
+            return
+        self._stop.clear()
+        self._pool = self._new_pool()
+        self._threads = [threading.Thread(target=self._dispatch_loop, name="ingest-dispatch", daemon=True)]
+        if self.watch_dir:
+            self._threads.append(threading.Thread(target=self._watch_loop, name="ingest-watch", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        if self._pool is None:
+            return
+        self._stop.set()
+        self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout=5)
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        pool.shutdown(wait=True, cancel_futures=True)
+        self._threads = []
+        if self._watch_lock_file is not None:
+            self._watch_lock_file.close()  # 락 해제
+            self._watch_lock_file = None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # 서버 프로세스는 스레드가 많아서 fork 대신 spawn
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> Optional[ProcessPoolExecutor]:
+        """깨진 풀을 새 풀로 교체 (다른 스레드가 이미 교체했으면 그 풀을 반환, 종료 중이면 None)"""
+        with self._pool_lock:
+            if self._pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._new_pool()
+            return self._pool
+
+    # ---------- 작업 ----------
+    def submit(self, pdf_path: str, patient_id: Optional[str] = None) -> Dict:
+        """작업 등록 (같은 파일이 이미 대기/실행 중이면 그 작업을 반환)"""
+        if self._pool is None:
+            # startup 이벤트 없이 쓰이는 경우(스크립트/테스트 클라이언트 등)
+            self.start()
+        pdf_path = os.path.abspath(pdf_path)
+        with self._done:
+            self._prune_jobs(time.monotonic())
+            job_id = self._active.get(pdf_path)
+            if job_id:
+                job = self._jobs[job_id]
+                if patient_id and not job["patient_id"] and job["status"] == "queued":
+                    job["patient_id"] = patient_id
+                return dict(job)
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "pdf_path": pdf_path,
+                "patient_id": patient_id,
+                "status": "queued",
+                "attempts": 0,
+                "result": None,
+                "error": None,
+                "submitted_at": datetime.now().isoformat(),
+                "finished_at": None,
+            }
+            self._active[pdf_path] = job_id
+        self._queue.put(job_id)
+        return dict(self._jobs[job_id])
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self._done:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    async def await_job(self, job_id: str, timeout: float, interval: float = 0.05) -> Optional[Dict]:
+        """작업이 끝나거나 timeout(초)이 지날 때까지 대기 (이벤트 루프/스레드풀 스레드를 막지 않고 interval 간격으로 확인)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get_job(job_id)
+            if job is None or job["status"] in ("done", "failed") or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            with self._done:
+                job = self._jobs[job_id]
+                job["status"] = "running"
+                job["attempts"] += 1
+            try:
+                future = self._submit_to_pool(job)
+            except RuntimeError as e:
+                # 종료 중 풀에 제출 실패 (새 풀도 바로 깨진 경우 포함)
+                self._finish(job_id, error=str(e))
+                continue
+            future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+
+    def _submit_to_pool(self, job: Dict):
+        pool = self._pool
+        if pool is None:
+            raise RuntimeError("수집기가 종료되었습니다")
+        try:
+            return pool.submit(_ingest_pdf, job["pdf_path"], job["patient_id"])
+        except BrokenProcessPool:
+            # 이전 작업 중 워커 프로세스가 죽어 풀이 깨짐 → 새 풀에 다시 제출
+            pool = self._replace_pool(pool)
+            if pool is None:
+                raise
+            return pool.submit(_ingest_pdf, job["pdf_path"], job["patient_id"])
+
+    def _on_done(self, job_id: str, future):
+        try:
+            self._finish(job_id, result=future.result())
+        except BrokenProcessPool as e:
+            # 실행 중 워커 프로세스가 죽음 → 다시 큐에 넣으면 디스패처가 새 풀로 제출
+            if not self._retry(job_id):
+                traceback.print_exc()
+                self._finish(job_id, error=f"워커 프로세스 비정상 종료: {e}")
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(job_id, error=str(e))
+
+    def _retry(self, job_id: str) -> bool:
+        with self._done:
+            job = self._jobs[job_id]
+            if self._stop.is_set() or job["attempts"] > INGEST_RETRIES:
+                return False
+            job["status"] = "queued"
+        self._queue.put(job_id)
+        return True
+
+    def _finish(self, job_id: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        with self._done:
+            job = self._jobs[job_id]
+            job["status"] = "failed" if error else "done"
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = datetime.now().isoformat()
+            self._active.pop(job["pdf_path"], None)
+            self._finished[job_id] = time.monotonic()
+            self._done.notify_all()
+
+    def _prune_jobs(self, now: float):
+        # self._done 안에서 호출, _finished 앞쪽이 가장 먼저 끝난 작업
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if now - finished_at < self.job_ttl:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    # ---------- 업로드 폴더 감시 ----------
+    def scan_once(self):
+        """감시 폴더에서 새로 생기거나 바뀐 PDF를 작업으로 등록"""
+        pdf_paths = glob.glob(os.path.join(self.watch_dir, "*.pdf"))
+        # 지워진 파일은 기록에서도 제거
+        for pdf_path in set(self._seen) - set(pdf_paths):
+            del self._seen[pdf_path]
+
+        for pdf_path in pdf_paths:
+            try:
+                st = os.stat(pdf_path)
+            except FileNotFoundError:
+                continue
+            signature = (st.st_mtime_ns, st.st_size)
+            if self._seen.get(pdf_path) == signature:
+                continue
+            self._seen[pdf_path] = signature
+            patient_id = self.patient_resolver(pdf_path) if self.patient_resolver else None
+            # 캐시와 DB가 모두 최신이면 파싱할 필요 없음
+            sha256 = nursing_notes_cache.lookup_sha256(pdf_path)
+            if sha256 is None or (patient_id and db_manager.get_nursing_notes_source(patient_id) != sha256):
+                self.submit(pdf_path, patient_id=patient_id)
+
+    def _acquire_watch_lock(self) -> bool:
+        """감시 소유권 (다른 워커 프로세스가 쥐고 있으면 False, 다음 주기에 다시 시도)"""
+        if self._watch_lock_file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.watch_lock), exist_ok=True)
+        lock_file = open(self.watch_lock, "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._watch_lock_file = lock_file
+        return True
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            try:
+                if self._acquire_watch_lock():
+                    self.scan_once()
+            except Exception:
+                traceback.print_exc()
+            self._stop.wait(self.poll_seconds)
+
+# 전역 수집기 인스턴스 (main.py startup/shutdown 이벤트에서 시작/종료)
+ingestion_worker = IngestionWorker(watch_dir=UPLOADS_DIR if INGEST_WATCH else None)
@@ -0,0 +1,93 @@
+# backend/intent_router.py
+import re
+import threading
+from typing import Dict, Optional
+
+# 시스템 프롬프트(chatbot_core.system_prompt)의 안내 예시와 같은 문구
+STATUS_REPLY = (
+    "환자분의 구체적인 상태는 '환자 상태 정보' 페이지에서 확인하실 수 있어요. \n"
+    "추가 문의가 필요하시면 병원 간호사 선생님께 연락 부탁드려요. 📞 031-919-0041"
+)
+SCHEDULE_REPLY = (
+    "해당 일정은 병동 내 상황에 따라 변경될 수 있어 정확한 시간 안내는 어려워요. \n"
+    "자세한 내용은 병원 간호사 선생님께 직접 문의해 주시면 안내해드릴 수 있을 거예요. 📞 031-919-0041"
+)
+
+INTENT_REPLIES = {
+    "상태 확인": STATUS_REPLY,
+    "일정 문의": SCHEDULE_REPLY,
+}
+
+# 감정/불안 표현이 섞이면 공감이 필요하므로 LLM으로 보냄
+EMOTION_REGEX = re.compile(
+    r"걱정|불안|염려|무섭|무서|두렵|두려|죄책|미안|죄송|속상|슬프|슬퍼|힘들|힘드|힘겹|눈물|울컥|"
+    r"외롭|외로|보고\s*싶|괴롭|답답|서운|후회|마음이|나빠|악화|혹시"
+)
+# 챗봇/알림 등 시스템 질문은 LLM이 설명
+SYSTEM_REGEX = re.compile(r"챗봇|알림|문자|카톡|카카오|로그인|앱|어플|기능")
+
+SCHEDULE_SUBJECT_REGEX = re.compile(
+    r"면회|면담|식사|밥|아침|점심|저녁|간식|목욕|샤워|외출|외박|프로그램|재활|물리\s*치료|회진|방문|산책"
+)
+SCHEDULE_TIME_REGEX = re.compile(r"시간|몇\s*시|언제|요일|일정|스케줄|며칠|무슨\s*날")
+
+PATIENT_REGEX = re.compile(r"어머니|아버지|어머님|아버님|엄마|아빠|할머니|할아버지|부모님|어르신|환자")
+STATUS_REGEX = re.compile(
+    r"컨디션|상태|괜찮|건강|안부|주무|잠은|잘\s*드|잘\s*드셨|식사는?\s*잘|열이|혈압|넘어|낙상|다치|아프|아파|기침"
+)
+QUESTION_REGEX = re.compile(r"\?|어때|어떤가|어떠|어떻|[나까가죠]요?\s*$|인가요|셨나요|습니까|신지")
+
+
+def classify_intent(text: str) -> Optional[str]:
+    """
+    키워드/정규식 기반 의도 분류 (확신할 수 있을 때만 "상태 확인" / "일정 문의", 아니면 None)
+    few-shot 예시의 의도 이름을 그대로 사용
+    """
+    if not text or EMOTION_REGEX.search(text) or SYSTEM_REGEX.search(text):
+        return None
+    if not QUESTION_REGEX.search(text):
+        return None
+
+    schedule = bool(SCHEDULE_SUBJECT_REGEX.search(text) and SCHEDULE_TIME_REGEX.search(text))
+    status = bool(STATUS_REGEX.search(text) and (PATIENT_REGEX.search(text) or len(text) <= 30))
+
+    # 둘 다 해당하면(예: "식사는 잘 하셨는지 몇 시에…") 애매하므로 LLM에 맡김
+    if schedule == status:
+        return None
+    return "일정 문의" if schedule else "상태 확인"
+
+
+class IntentRouter:
+    """
+    LLM 앞단 의도 라우터: 상태 확인/일정 문의는 고정 안내 문구로 바로 응답
+    (분류 결과별 건수를 세어 /chat/router-stats로 노출)
+    """
+
+    def __init__(self, replies: Dict[str, str] = INTENT_REPLIES):
+        self.replies = replies
+        self._lock = threading.Lock()
+        self._counters = {intent: 0 for intent in replies}
+        self._counters["llm"] = 0
+
+    def route(self, text: str) -> Optional[Dict[str, str]]:
+        """고정 응답할 수 있으면 {"intent", "reply"}, 아니면 None"""
+        intent = classify_intent(text)
+        with self._lock:
+            self._counters[intent if intent in self.replies else "llm"] += 1
+        if intent not in self.replies:
+            return None
+        return {"intent": intent, "reply": self.replies[intent]}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        total = sum(counters.values())
+        routed = total - counters["llm"]
+        return {
+            **counters,
+            "total": total,
+            "routed_rate": round(routed / total, 4) if total else 0.0,
+        }
+
+# 전역 라우터 인스턴스
+intent_router = IntentRouter()
@@ -0,0 +1,61 @@
+# backend/llm_usage.py
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# /chat/prompt-cache-stats에 보여줄 최근 호출 수
+LLM_USAGE_RECENT = int(os.getenv("LLM_USAGE_RECENT", "50"))
+
+
+class PromptCacheStats(BaseCallbackHandler):
+    """
+    LLM 호출별 입력 토큰 중 제공자 프롬프트 캐시에서 읽은 토큰(cache_read) 집계
+    usage_metadata가 없는 응답(스트리밍에서 usage 미포함 등)은 건너뜀
+    """
+
+    def __init__(self, recent: int = LLM_USAGE_RECENT):
+        self._lock = threading.Lock()
+        self._recent: "deque[Dict[str, Any]]" = deque(maxlen=recent)
+        self._totals = {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self._record(usage)
+
+    def _record(self, usage: Dict[str, Any]):
+        input_tokens = usage.get("input_tokens", 0)
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        call = {
+            "at": datetime.now().isoformat(),
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "uncached_tokens": input_tokens - cached_tokens,
+            "output_tokens": usage.get("output_tokens", 0),
+        }
+        with self._lock:
+            self._recent.append(call)
+            self._totals["calls"] += 1
+            self._totals["input_tokens"] += input_tokens
+            self._totals["cached_tokens"] += cached_tokens
+            self._totals["output_tokens"] += call["output_tokens"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self._totals)
+            recent: List[Dict[str, Any]] = list(self._recent)
+        totals["uncached_tokens"] = totals["input_tokens"] - totals["cached_tokens"]
+        totals["cached_rate"] = (
+            round(totals["cached_tokens"] / totals["input_tokens"], 4) if totals["input_tokens"] else 0.0
+        )
+        return {**totals, "recent": recent}
+
+# 전역 집계 인스턴스 (chatbot_core.llm 콜백)
+prompt_cache_stats = PromptCacheStats()
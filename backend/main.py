@@ -1,10 +1,11 @@
 # backend/main.py
-from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi import FastAPI, HTTPException, Body, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any, Union
-from datetime import datetime
+from datetime import date, datetime
+import asyncio
 import importlib
 import json
 import os
@@ -23,23 +24,47 @@ except ImportError:
 
 # ===== 프로젝트 내부 모듈 =====
 try:
-    from .chatbot_core import get_emotional_support_response  # type: ignore
+    from .chatbot_core import (  # type: ignore
+        aget_emotional_support_response,
+        astream_emotional_support_response,
+    )
+    from .response_cache import response_cache  # type: ignore
+    from .intent_router import intent_router  # type: ignore
+    from .llm_usage import prompt_cache_stats  # type: ignore
+    from .chat_log_writer import chat_log_writer  # type: ignore
+    from .chat_log_queries import chat_log_queries  # type: ignore
     from .ocr_records import (  # type: ignore
-        extract_text_from_pdf,
         parse_by_date,
         compare_changes_with_text,
-        build_nursing_notes_json,
+        build_notes_from_records,
+        parse_nursing_pdf,
+        iter_parse_by_date,
+        iter_pdf_page_texts,
     )
     from .database import db_manager  # type: ignore
+    from .ingest_worker import ingestion_worker  # type: ignore
+    from .document_registry import document_registry  # type: ignore
 except ImportError:
-    from chatbot_core import get_emotional_support_response
+    from chatbot_core import (
+        aget_emotional_support_response,
+        astream_emotional_support_response,
+    )
+    from response_cache import response_cache
+    from intent_router import intent_router
+    from llm_usage import prompt_cache_stats
+    from chat_log_writer import chat_log_writer
+    from chat_log_queries import chat_log_queries
     from ocr_records import (
-        extract_text_from_pdf,
         parse_by_date,
         compare_changes_with_text,
-        build_nursing_notes_json,
+        build_notes_from_records,
+        parse_nursing_pdf,
+        iter_parse_by_date,
+        iter_pdf_page_texts,
     )
     from database import db_manager
+    from ingest_worker import ingestion_worker
+    from document_registry import document_registry
 
 # ==============================
 # FastAPI App
@@ -64,6 +89,29 @@ app.add_middleware(
 # ----- 카카오 라우터 -----
 app.include_router(kakao_router)
 
+# ----- 간호기록 PDF 백그라운드 수집기 -----
+# 캐시에 없을 때 요청 핸들러가 기다려 주는 최대 시간(초)
+INGEST_WAIT_SECONDS = float(os.getenv("INGEST_WAIT_SECONDS", "3"))
+
+@app.on_event("startup")
+def start_ingestion_worker():
+    # 레지스트리 초기 등록이 먼저 끝나야 수집기가 uploads/ 파일의 환자ID를 찾을 수 있음
+    seed_patient_documents()
+    ingestion_worker.start()
+
+@app.on_event("shutdown")
+def stop_ingestion_worker():
+    ingestion_worker.stop()
+
+@app.on_event("shutdown")
+def stop_chat_log_writer():
+    # 큐에 남은 대화 기록을 모두 chat_log에 쓰고 종료
+    chat_log_writer.stop()
+
+@app.on_event("shutdown")
+def close_database_connections():
+    db_manager.close_all()
+
 # ==============================
 # 스키마
 # ==============================
@@ -74,6 +122,13 @@ class ChatRequest(BaseModel):
 class AnalyzePdfRequest(BaseModel):
     pdf_path: str
 
+class RegisterDocumentRequest(BaseModel):
+    pdf_path: str
+
+class IngestRequest(BaseModel):
+    pdf_path: str
+    patient_id: Optional[str] = None
+
 class ParseByDateRequest(BaseModel):
     text: str
 
@@ -101,8 +156,12 @@ def root():
 # ==============================
 # 챗봇
 # ==============================
+# 동시에 LLM을 호출하는 대화 수 상한 (초과분은 대기)
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "200"))
+chat_semaphore = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+
 @app.post("/chat")
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     """
     요청(JSON):
       { "message": "안녕", "session_id": "demo-session" }  # session_id는 선택
@@ -111,32 +170,137 @@ def chat(req: ChatRequest):
     """
     try:
         session_id = (req.session_id or "web").strip() or "web"
-        reply_text = get_emotional_support_response(
-            session_id=session_id,     # ✅ 이름 맞춤
-            user_input=req.message     # ✅ 이름 맞춤
-        )
+        async with chat_semaphore:
+            reply_text = await aget_emotional_support_response(
+                session_id=session_id,     # ✅ 이름 맞춤
+                user_input=req.message     # ✅ 이름 맞춤
+            )
         return {"ok": True, "reply": reply_text}
     except Exception as e:
         # 서버 콘솔에 스택트레이스 출력(디버그 도움)
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"chat failed: {e}")
 
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    요청(JSON)은 /chat과 동일, 응답은 SSE(text/event-stream):
+      data: {"token": "안녕"}        ← 토큰마다
+      event: done / data: {}          ← 정상 종료 (이 시점에 chat_log 기록 대기열에 들어감)
+      event: error / data: {"detail"} ← 실패
+    """
+    session_id = (req.session_id or "web").strip() or "web"
+
+    async def event_stream():
+        async with chat_semaphore:
+            try:
+                async for token in astream_emotional_support_response(
+                    session_id=session_id,
+                    user_input=req.message
+                ):
+                    yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+                yield "event: done\ndata: {}\n\n"
+            except Exception as e:
+                traceback.print_exc()
+                yield f"event: error\ndata: {json.dumps({'detail': f'chat failed: {e}'}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # 프록시(nginx 등) 버퍼링 없이 바로 전달
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/chat/cache-stats")
+def chat_cache_stats():
+    """답변 캐시 적중률 등 (이 워커 프로세스 기준)"""
+    return response_cache.stats()
+
+@app.get("/chat/router-stats")
+def chat_router_stats():
+    """의도 라우터 분류 건수 (고정 안내로 바로 응답한 비율, 이 워커 프로세스 기준)"""
+    return intent_router.stats()
+
+@app.get("/chat/prompt-cache-stats")
+def chat_prompt_cache_stats():
+    """LLM 호출별 프롬프트 캐시 적중 토큰(cached) / 비캐시 토큰 (이 워커 프로세스 기준, 최근 호출 목록 포함)"""
+    return prompt_cache_stats.stats()
+
+def _flush_chat_log():
+    if not chat_log_writer.flush():
+        raise HTTPException(status_code=503, detail="대화 기록을 아직 저장하지 못했습니다. 잠시 후 다시 시도해 주세요")
+
+@app.get("/chat/sessions/{session_id}/transcript")
+def get_chat_transcript(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=500, description="최대 턴 수"),
+    cursor: Optional[int] = Query(None, description="이전 응답의 next_cursor"),
+):
+    """
+    응답(JSON):
+      { "ok": true, "session_id": "...", "turns": [{id, user_input, bot_response, timestamp}], "next_cursor": 123 | null }
+    """
+    # 큐에 남아 있는 이 프로세스의 대화까지 포함 (못 쓰면 최신이 아닌 결과 대신 503)
+    _flush_chat_log()
+    try:
+        page = chat_log_queries.transcript(session_id, limit=limit, after=cursor)
+        return {"ok": True, "session_id": session_id, **page}
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"transcript failed: {e}")
+
+@app.get("/chat/stats/daily")
+def get_chat_daily_stats(
+    date_from: Optional[str] = Query(None, alias="from", description="시작 날짜 (YYYY-MM-DD, UTC, 포함)"),
+    date_to: Optional[str] = Query(None, alias="to", description="끝 날짜 (YYYY-MM-DD, UTC, 포함)"),
+):
+    """
+    날짜별 대화 집계
+    응답(JSON): { "ok": true, "days": [{day, turns, sessions, avg_user_chars, avg_reply_chars}] }
+    """
+    _flush_chat_log()
+    try:
+        return {"ok": True, "days": chat_log_queries.daily_stats(date_from, date_to)}
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"daily stats failed: {e}")
+
 # ==============================
 # PDF 분석/간호기록 파싱
 # ==============================
 @app.post("/analyze-pdf")
 def analyze_pdf(req: AnalyzePdfRequest):
     try:
-        text = extract_text_from_pdf(req.pdf_path)
-        by_date = parse_by_date(text)
-        notes_json = build_nursing_notes_json(req.pdf_path)
-        return {"ok": True, "by_date": by_date, "notes": notes_json}
+        # PDF는 한 번만 파싱하고 by_date / notes를 같은 텍스트에서 만든다
+        parsed = parse_nursing_pdf(req.pdf_path)
+        return {
+            "ok": True,
+            "by_date": parsed["by_date"],
+            "notes": parsed["notes"],
+            "page_timings": parsed["page_timings"],
+        }
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"analyze-pdf failed: {e}")
 
+@app.post("/analyze-pdf/stream")
+def analyze_pdf_stream(req: AnalyzePdfRequest):
+    """
+    페이지 단위 스트리밍 분석 (NDJSON)
+    추출이 끝나기 전이라도 완성된 레코드부터 한 줄씩 내려보냄:
+      {"date": "2025-07-23", "label": "수면", "block": "..."}
+    """
+    if not os.path.exists(req.pdf_path):
+        raise HTTPException(status_code=404, detail=f"PDF 파일이 없습니다: {req.pdf_path}")
+
+    def generate():
+        for date, label, block in iter_parse_by_date(iter_pdf_page_texts(req.pdf_path)):
+            yield json.dumps({"date": date, "label": label, "block": block}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.post("/parse-by-date")
 def parse_by_date_api(req: ParseByDateRequest):
     try:
@@ -159,9 +323,10 @@ def compare_changes_api(req: CompareChangesRequest):
 # ==============================
 # 환자ID → PDF 매핑 & 경로 헬퍼
 # ==============================
-PATIENT_PDFS: Dict[str, str] = {
+# 레지스트리(carebot.db patient_documents)가 비어 있을 때만 쓰는 초기 매핑
+INITIAL_PATIENT_PDFS: Dict[str, str] = {
     "25-0000032": "uploads/김x애-간호기록지.pdf",
-    # 필요 시 계속 추가
+    # 필요 시 POST /patients/{patient_id}/documents 로 등록
     # "23-0000009": "uploads/장x규-간호기록지.pdf",
 }
 
@@ -170,33 +335,138 @@ def _abs_path(rel_or_abs: str) -> str:
     base = os.path.dirname(os.path.abspath(__file__))
     return rel_or_abs if os.path.isabs(rel_or_abs) else os.path.join(base, rel_or_abs)
 
+# 수집기가 uploads/에서 찾은 파일을 nursing_notes 테이블에 저장할 때 환자ID 역매핑
+ingestion_worker.patient_resolver = document_registry.patient_for_path
+
+def seed_patient_documents():
+    document_registry.seed({pid: _abs_path(path) for pid, path in INITIAL_PATIENT_PDFS.items()})
+
 # ==============================
 # 환자 간호기록 라우트
 # ==============================
-@app.get("/patients/{patient_id}/nursing-notes")
-def get_nursing_notes(patient_id: str):
-    rel_path = PATIENT_PDFS.get(patient_id)
-    if not rel_path:
+def _resolve_document(patient_id: str, revalidate: bool = False) -> Dict:
+    """환자의 현재 PDF (등록된 적 없거나 파일이 사라졌으면 404)"""
+    try:
+        doc = document_registry.resolve(patient_id, revalidate=revalidate)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"PDF 파일이 없습니다: {e.filename}")
+    if not doc:
         raise HTTPException(status_code=404, detail=f"등록된 PDF가 없습니다: {patient_id}")
+    return doc
 
-    full_path = _abs_path(rel_path)
-    if not os.path.exists(full_path):
-        raise HTTPException(status_code=404, detail=f"PDF 파일이 없습니다: {full_path}")
+@app.get("/patients/{patient_id}/nursing-notes")
+async def get_nursing_notes(
+    patient_id: str,
+    date_from: Optional[str] = Query(None, alias="from", description="시작 날짜 (YYYY-MM-DD, 포함)"),
+    date_to: Optional[str] = Query(None, alias="to", description="끝 날짜 (YYYY-MM-DD, 포함)"),
+    limit: Optional[int] = Query(None, ge=1, le=366, description="최대 날짜 수"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    include_raw: bool = Query(True, description="false면 원문 블록(by_date) 생략"),
+):
+    """
+    응답(JSON):
+      { "ok": true, "patient_id": "...", "notes": [...], "by_date": {...}, "next_cursor": "2025-07-29" | null }
+    next_cursor가 있으면 cursor로 넘겨 다음 페이지 조회
+    아직 파싱 중이면(최대 INGEST_WAIT_SECONDS 대기 후) 202:
+      { "ok": false, "patient_id": "...", "status": "queued" | "running", "job_id": "..." }
+    → 잠시 후 다시 요청하거나 /ingest/jobs/{job_id}로 진행 상태 확인
+    대기는 비동기(await)라 기다리는 동안 스레드풀 스레드를 점유하지 않음 (DB 조회만 스레드에서 실행)
+    """
+    doc = await asyncio.to_thread(_resolve_document, patient_id)
 
-    # JSON 형태 간호기록
-    notes_json = build_nursing_notes_json(full_path)
-    # 날짜별 원문 파싱(옵션: 프론트에서 날짜 드롭다운/원문 하이라이트 등에 활용)
-    text = extract_text_from_pdf(full_path)
-    by_date = parse_by_date(text)
+    # 백그라운드 수집기가 미리 저장해 둔 결과만 조회 (요청 스레드에서 pdfplumber 실행 안 함)
+    if await asyncio.to_thread(db_manager.get_nursing_notes_source, patient_id) != doc["sha256"]:
+        job = ingestion_worker.submit(doc["path"], patient_id=patient_id)
+        job = await ingestion_worker.await_job(job["job_id"], timeout=INGEST_WAIT_SECONDS)
+        if job["status"] == "failed":
+            raise HTTPException(status_code=500, detail=f"간호기록 파싱 실패: {job['error']}")
+        # 그 사이 파일이 바뀌었거나 지워졌을 수 있으므로 레지스트리도 다시 확인
+        doc = await asyncio.to_thread(_resolve_document, patient_id, True)
+        if (job["status"] != "done"
+                or await asyncio.to_thread(db_manager.get_nursing_notes_source, patient_id) != doc["sha256"]):
+            # 아직 파싱 중 → 잠시 후 다시 요청
+            return JSONResponse(status_code=202, content={
+                "ok": False,
+                "patient_id": patient_id,
+                "status": job["status"],
+                "job_id": job["job_id"],
+            })
 
-    return {
+    return await asyncio.to_thread(
+        _nursing_notes_page, patient_id, doc["path"], date_from, date_to, limit, cursor, include_raw,
+    )
+
+def _nursing_notes_page(patient_id: str, full_path: str, date_from: Optional[str], date_to: Optional[str],
+                        limit: Optional[int], cursor: Optional[str], include_raw: bool) -> Dict:
+    # 요청한 창(window)만큼만 DB에서 읽음 (limit+1개로 다음 페이지 유무 확인)
+    by_date = db_manager.get_nursing_notes(
+        patient_id,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit + 1 if limit else None,
+        after=cursor,
+    )
+    next_cursor = None
+    if limit and len(by_date) > limit:
+        by_date.pop(list(by_date)[-1])
+        next_cursor = list(by_date)[-1]
+
+    response = {
         "ok": True,
         "patient_id": patient_id,
         "resolved_path": full_path,
-        "by_date": by_date,
-        "notes": notes_json,
+        # JSON 형태 간호기록
+        "notes": build_notes_from_records(by_date),
+        "next_cursor": next_cursor,
+    }
+    if include_raw:
+        # 날짜별 원문 파싱(옵션: 프론트에서 날짜 드롭다운/원문 하이라이트 등에 활용)
+        response["by_date"] = by_date
+    return response
+
+def _document_json(doc: Dict) -> Dict:
+    return {key: doc[key] for key in ("patient_id", "version", "path", "size", "mtime_ns", "sha256")}
+
+@app.post("/patients/{patient_id}/documents")
+def register_patient_document(patient_id: str, req: RegisterDocumentRequest):
+    """
+    환자 간호기록 PDF 등록 (내용이 바뀌었으면 새 버전) + 백그라운드 파싱 작업 등록
+    요청(JSON): { "pdf_path": "uploads/김x애-간호기록지.pdf" }
+    """
+    full_path = _abs_path(req.pdf_path)
+    if not os.path.exists(full_path):
+        raise HTTPException(status_code=404, detail=f"PDF 파일이 없습니다: {full_path}")
+    doc = document_registry.register(patient_id, full_path)
+    job = ingestion_worker.submit(full_path, patient_id=patient_id)
+    return {"ok": True, "document": _document_json(doc), "job": job}
+
+@app.get("/patients/{patient_id}/documents")
+def list_patient_documents(patient_id: str):
+    docs = db_manager.list_patient_documents(patient_id)
+    return {
+        "ok": True,
+        "documents": [dict(_document_json(doc), is_current=doc["is_current"]) for doc in docs],
     }
 
+# ==============================
+# 간호기록 PDF 수집 작업
+# ==============================
+@app.post("/ingest/jobs")
+def create_ingest_job(req: IngestRequest):
+    """PDF 파싱 작업 등록 → {"ok": true, "job": {...}}"""
+    full_path = _abs_path(req.pdf_path)
+    if not os.path.exists(full_path):
+        raise HTTPException(status_code=404, detail=f"PDF 파일이 없습니다: {full_path}")
+    job = ingestion_worker.submit(full_path, patient_id=req.patient_id)
+    return {"ok": True, "job": job}
+
+@app.get("/ingest/jobs/{job_id}")
+def get_ingest_job(job_id: str):
+    job = ingestion_worker.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"작업이 없습니다: {job_id}")
+    return {"ok": True, "job": job}
+
 # ==============================
 # 피드백 저장
 # ==============================
@@ -250,10 +520,27 @@ def save_feedback(req: FeedbackRequest):
 # ==============================
 # 저장된 피드백 조회
 # ==============================
+def _parse_date_param(value: Optional[str], name: str) -> Optional[str]:
+    """날짜 쿼리 파라미터 → 'YYYY-MM-DD' (형식이 틀리면 400)"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"잘못된 날짜입니다 ({name}={value}, YYYY-MM-DD 형식)")
+
 @app.get("/feedback")
-def get_feedback():
+def get_feedback(
+    limit: int = Query(50, ge=1, le=500, description="페이지 크기"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    rating: Optional[int] = Query(None, ge=1, le=5, description="이 별점만"),
+    min_rating: Optional[int] = Query(None, ge=1, le=5, description="이 별점 이상"),
+    date_from: Optional[str] = Query(None, alias="from", description="시작 날짜 (YYYY-MM-DD, created_at 기준, 포함)"),
+    date_to: Optional[str] = Query(None, alias="to", description="끝 날짜 (YYYY-MM-DD, created_at 기준, 포함)"),
+    aggregate: bool = Query(False, description="true면 목록 대신 집계만"),
+):
     """
-    저장된 모든 피드백 조회
+    저장된 피드백 조회 (최신순, 페이지 단위)
     
     응답(JSON):
       {
@@ -267,13 +554,40 @@ def get_feedback():
             "timestamp": "2024-01-01T12:00:00.000Z",
             "created_at": "2024-01-01T12:00:00.000Z"
           }
-        ]
+        ],
+        "next_cursor": "2024-01-01 12:00:00|1"   ← 있으면 cursor로 넘겨 다음 페이지 조회
       }
+    
+    aggregate=true 응답(JSON):
+      { "ok": True, "summary": { "count": 10, "avg_rating": 4.2, "histogram": {"1": 0, ..., "5": 6} } }
     """
     try:
-        feedback_data = db_manager.get_feedback()
-        return {"ok": True, "feedback": feedback_data}
+        # YYYY-MM-DD가 아니면 SQL의 date(?)가 NULL이 되어 빈 결과가 나오므로 미리 거름
+        filters = {
+            "rating": rating,
+            "min_rating": min_rating,
+            "date_from": _parse_date_param(date_from, "from"),
+            "date_to": _parse_date_param(date_to, "to"),
+        }
+        if aggregate:
+            return {"ok": True, "summary": db_manager.get_feedback_summary(**filters)}
+        
+        after = None
+        if cursor:
+            created_at, _, feedback_id = cursor.rpartition("|")
+            if not created_at or not feedback_id.isdigit():
+                raise HTTPException(status_code=400, detail="잘못된 cursor입니다")
+            after = (created_at, int(feedback_id))
+        
+        feedback_data, next_cursor = db_manager.get_feedback_page(limit=limit, after=after, **filters)
+        return {
+            "ok": True,
+            "feedback": feedback_data,
+            "next_cursor": f"{next_cursor[0]}|{next_cursor[1]}" if next_cursor else None,
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"피드백 조회 실패: {e}")
@@ -313,6 +627,11 @@ def get_my_patients(request: Request):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"환자 목록 조회 실패: {e}")
 
+@app.get("/my-patients/cache-stats")
+def get_my_patients_cache_stats():
+    """환자 목록 캐시 적중/미스/무효화 횟수 (이 워커 프로세스 기준)"""
+    return db_manager.user_patients_cache_stats()
+
 # ==============================
 # 사용자-환자 연결 추가
 # ==============================
@@ -0,0 +1,302 @@
+# backend/ocr_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .ocr_records import (  # type: ignore
+        build_notes_from_records,
+        build_parse_result,
+        extract_pages_from_pdf,
+        find_last_date_page,
+        join_page_texts,
+        parse_by_date,
+    )
+except ImportError:
+    from ocr_records import (
+        build_notes_from_records,
+        build_parse_result,
+        extract_pages_from_pdf,
+        find_last_date_page,
+        join_page_texts,
+        parse_by_date,
+    )
+
+
+class NursingNotesCache:
+    """
+    간호기록 PDF 파싱 결과 영속 캐시 (content-addressed)
+
+    - pdf_parse_results : 파일 내용 해시(sha256) → 추출 텍스트 / by_date / notes
+    - pdf_parse_cache   : 파일 경로 + mtime + size → sha256
+
+    - pdf_incremental_state : 경로별 마지막 날짜 헤더 페이지/날짜 (증분 재파싱용)
+
+    경로/mtime/size가 그대로면 stat 한 번과 SELECT 한 번으로 끝나고,
+    파일이 바뀌었더라도 내용 해시가 같으면 pdfplumber를 다시 열지 않습니다.
+    내용이 바뀐 경우 간호기록은 뒤에만 추가되므로, 이전 버전의 마지막 날짜가
+    시작된 페이지부터만 추출해서 앞부분 결과와 합칩니다.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(__file__), "cache", "ocr_cache.db")
+        self.db_path = db_path
+        # 테이블 생성은 import/생성 시가 아니라 첫 조회 때 한 번 (DatabaseManager와 같은 방식)
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self.init_database()
+                    self._schema_ready = True
+        return sqlite3.connect(self.db_path)
+
+    def init_database(self):
+        """캐시 테이블 생성 (평소에는 첫 조회 때 자동으로 실행)"""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pdf_parse_results (
+                sha256 TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                by_date TEXT NOT NULL,
+                notes TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pdf_parse_cache (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # page 번호는 1부터, resume_page = 마지막 날짜 헤더가 있는 페이지
+        # anchor_sha256 = resume_page 직전 페이지 텍스트 해시 (앞부분 변경 여부 확인용)
+        # prefix_chars = resume_page 이전 페이지들의 텍스트 길이
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pdf_incremental_state (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                page_count INTEGER NOT NULL,
+                resume_page INTEGER NOT NULL,
+                resume_date TEXT NOT NULL,
+                anchor_sha256 TEXT,
+                prefix_chars INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def get(self, pdf_path: str) -> Optional[Dict]:
+        """경로/mtime/size가 일치하는 캐시만 조회 (파일 내용은 읽지 않음)"""
+        st = os.stat(pdf_path)
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT r.text, r.by_date, r.notes, r.sha256
+            FROM pdf_parse_cache c
+            JOIN pdf_parse_results r ON c.sha256 = r.sha256
+            WHERE c.path = ? AND c.mtime_ns = ? AND c.size = ?
+        ''', (os.path.abspath(pdf_path), st.st_mtime_ns, st.st_size))
+
+        row = cursor.fetchone()
+        conn.close()
+
+        return self._row_to_result(row[:3], row[3]) if row else None
+
+    def lookup_sha256(self, pdf_path: str) -> Optional[str]:
+        """경로/mtime/size가 일치하면 캐시된 내용 해시 (결과 본문은 읽지 않음)"""
+        st = os.stat(pdf_path)
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT sha256 FROM pdf_parse_cache
+            WHERE path = ? AND mtime_ns = ? AND size = ?
+        ''', (os.path.abspath(pdf_path), st.st_mtime_ns, st.st_size))
+
+        row = cursor.fetchone()
+        conn.close()
+
+        return row[0] if row else None
+
+    def get_or_build(self, pdf_path: str) -> Dict:
+        """
+        캐시 조회 후 없으면 파싱해서 저장
+        반환: {"text": str, "by_date": {...}, "notes": [...], "sha256": 파싱한 파일 내용 해시}
+        """
+        cached = self.get(pdf_path)
+        if cached is not None:
+            return cached
+
+        path = os.path.abspath(pdf_path)
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT text, by_date, notes FROM pdf_parse_results WHERE sha256 = ?",
+                (sha256,)
+            )
+            row = cursor.fetchone()
+            if row:
+                # 같은 내용의 파일을 이미 파싱한 적 있음 → 경로 매핑만 갱신
+                result = self._row_to_result(row, sha256)
+            else:
+                # 해시에 쓴 바이트를 그대로 파싱 (파일을 다시 읽지 않음)
+                result, state = self._parse(cursor, path, data)
+                result["sha256"] = sha256
+                self._save_state(cursor, path, sha256, state)
+                cursor.execute('''
+                    INSERT OR REPLACE INTO pdf_parse_results (sha256, text, by_date, notes)
+                    VALUES (?, ?, ?, ?)
+                ''', (
+                    sha256,
+                    result["text"],
+                    json.dumps(result["by_date"], ensure_ascii=False),
+                    json.dumps(result["notes"], ensure_ascii=False),
+                ))
+
+            cursor.execute('''
+                INSERT OR REPLACE INTO pdf_parse_cache (path, mtime_ns, size, sha256, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (path, st.st_mtime_ns, st.st_size, sha256))
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        return result
+
+    def _parse(self, cursor, path: str, data: bytes) -> Tuple[Dict, Optional[Dict]]:
+        """
+        이전 버전 상태가 있으면 마지막 날짜 페이지 직전 페이지부터 한 번만 추출해서
+        앞부분은 이전 결과, 뒷부분은 새로 파싱한 결과로 합침
+        앞부분이 바뀌었거나 페이지가 줄었으면 나머지 앞 페이지만 더 추출해서 전체 파싱
+        """
+        cursor.execute('''
+            SELECT s.page_count, s.resume_page, s.resume_date, s.anchor_sha256, s.prefix_chars,
+                   r.text, r.by_date
+            FROM pdf_incremental_state s
+            JOIN pdf_parse_results r ON s.sha256 = r.sha256
+            WHERE s.path = ?
+        ''', (path,))
+        row = cursor.fetchone()
+        if not row or row[1] <= 1:
+            return self._parse_full(extract_pages_from_pdf(data))
+
+        page_count, resume_page, resume_date, anchor_sha256, prefix_chars, prev_text, prev_by_date = row
+        # [resume_page 직전 페이지(anchor), resume_page, ...] 를 한 번에 추출
+        pages = extract_pages_from_pdf(data, start=resume_page - 2)
+        merged = self._merge_tail(pages, page_count, resume_page, resume_date,
+                                  anchor_sha256, prefix_chars, prev_text, prev_by_date)
+        if merged is not None:
+            return merged
+
+        # 이미 추출한 뒷부분은 재사용하고 앞부분만 추가로 추출
+        return self._parse_full(extract_pages_from_pdf(data, stop=resume_page - 2) + pages)
+
+    def _parse_full(self, pages: List[Tuple[int, str, float]]) -> Tuple[Dict, Optional[Dict]]:
+        return build_parse_result(pages), self._build_state(pages, 0)
+
+    def _merge_tail(self, pages: List[Tuple[int, str, float]], page_count: int, resume_page: int,
+                    resume_date: str, anchor_sha256: Optional[str], prefix_chars: int,
+                    prev_text: str, prev_by_date: str) -> Optional[Tuple[Dict, Optional[Dict]]]:
+        """pages = resume_page 직전 페이지부터 끝까지, 합칠 수 없으면 None"""
+        # resume_page 직전 페이지가 그대로면 그 앞도 그대로라고 봄
+        anchor, tail = pages[:1], pages[1:]
+        if not anchor or anchor[0][0] != resume_page - 1 or _text_sha256(anchor[0][1]) != anchor_sha256:
+            return None
+        if not tail or tail[-1][0] < page_count:
+            return None
+
+        tail_text = join_page_texts(tail)
+        tail_by_date = parse_by_date(tail_text)
+        if resume_date not in tail_by_date:
+            return None
+
+        # resume_page 이전에 시작한 날짜는 이전 결과 그대로, 이후 날짜는 새로 파싱한 결과로
+        by_date = {
+            date: items for date, items in json.loads(prev_by_date).items()
+            if date not in tail_by_date
+        }
+        by_date.update(tail_by_date)
+
+        result = {
+            "text": prev_text[:prefix_chars] + tail_text,
+            "by_date": by_date,
+            "notes": build_notes_from_records(by_date),
+            "page_timings": [(page_no, round(seconds, 4)) for page_no, _, seconds in tail],
+        }
+        state = self._build_state(pages, prefix_chars - len(join_page_texts(anchor)))
+        return result, state
+
+    @staticmethod
+    def _build_state(pages: List[Tuple[int, str, float]], base_chars: int) -> Optional[Dict]:
+        """
+        pages: 연속된 페이지 목록, base_chars: pages 첫 페이지 이전 텍스트 길이
+        """
+        last = find_last_date_page(pages)
+        if last is None:
+            return None
+
+        resume_page, resume_date = last
+        before = [page for page in pages if page[0] < resume_page]
+        return {
+            "page_count": pages[-1][0],
+            "resume_page": resume_page,
+            "resume_date": resume_date,
+            "anchor_sha256": _text_sha256(before[-1][1]) if before else None,
+            "prefix_chars": base_chars + len(join_page_texts(before)),
+        }
+
+    @staticmethod
+    def _save_state(cursor, path: str, sha256: str, state: Optional[Dict]):
+        if state is None:
+            cursor.execute("DELETE FROM pdf_incremental_state WHERE path = ?", (path,))
+            return
+
+        cursor.execute('''
+            INSERT OR REPLACE INTO pdf_incremental_state
+                (path, sha256, page_count, resume_page, resume_date, anchor_sha256, prefix_chars, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (
+            path, sha256, state["page_count"], state["resume_page"], state["resume_date"],
+            state["anchor_sha256"], state["prefix_chars"],
+        ))
+
+    @staticmethod
+    def _row_to_result(row, sha256: str) -> Dict:
+        return {
+            "text": row[0],
+            "by_date": json.loads(row[1]),
+            "notes": json.loads(row[2]),
+            "sha256": sha256,
+        }
+
+def _text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# 전역 캐시 인스턴스
+nursing_notes_cache = NursingNotesCache()
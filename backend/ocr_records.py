@@ -1,8 +1,17 @@
+import io
+import multiprocessing
 import os
 import re
+import time
 import pdfplumber
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# 페이지 추출 프로세스 수 (1이면 기존처럼 순차 추출)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "1"))
+# 이보다 짧은 문서는 프로세스 풀 기동 비용이 더 커서 순차 추출
+PARALLEL_MIN_PAGES = int(os.getenv("OCR_PARALLEL_MIN_PAGES", "16"))
 
 SYMPTOM_TEMPLATES = {
     "수면장애": "수면",
@@ -41,10 +50,79 @@ SYMPTOM_REGEXES: Dict[str, re.Pattern] = {
     "파킨슨 증상심해져": re.compile(r"파킨슨\s*증상.*(심해|악화)"),
 }
 
+# 각 정규식이 매치되려면 반드시 포함되는 리터럴(anchor)
+# 서로 겹치거나 포함 관계가 없어야 한 번의 스캔으로 모든 등장 위치를 찾을 수 있음
+SYMPTOM_ANCHORS: Dict[str, str] = {
+    "자가배뇨": "배뇨",
+    "수면": "수면",
+    "욕창": "욕창",
+    "변조절": "조절",
+    "변을 못봄": "못봄",
+    "파킨슨 증상심해져": "파킨슨",
+}
+EXCLUDE_ANCHORS: List[str] = ["욕창", "낙상방지"]  # EXCLUDE_REGEXES와 같은 순서
+
+class SymptomMatcher:
+    """
+    증상/제외 라벨을 한 번의 스캔으로 찾는 매처
+    1) anchor 리터럴들의 alternation 정규식 하나로 블록을 한 번 훑어 후보 anchor를 모으고
+    2) 후보 anchor에 걸린 정규식만 원래 패턴으로 확인(fallback)
+    원래 패턴으로 최종 확인하므로 라벨 결과는 패턴별 루프와 동일합니다.
+    """
+
+    def __init__(self,
+                 symptom_regexes: Dict[str, re.Pattern],
+                 symptom_anchors: Dict[str, str],
+                 exclude_regexes: List[re.Pattern],
+                 exclude_anchors: List[str]):
+        self._symptoms: Dict[str, List[Tuple[str, re.Pattern]]] = {}
+        for label, pat in symptom_regexes.items():
+            self._symptoms.setdefault(symptom_anchors[label], []).append((label, pat))
+
+        self._excludes: Dict[str, List[re.Pattern]] = {}
+        for anchor, rx in zip(exclude_anchors, exclude_regexes):
+            self._excludes.setdefault(anchor, []).append(rx)
+
+        anchors = sorted(set(self._symptoms) | set(self._excludes), key=len, reverse=True)
+        self._anchor_regex = re.compile("|".join(re.escape(a) for a in anchors))
+
+    def _anchors_in(self, text: str) -> set:
+        return set(self._anchor_regex.findall(text))
+
+    def match(self, block: str) -> set:
+        """
+        블록의 증상 라벨 집합
+        제외 패턴(욕창 예방, 낙상방지 등)에 걸리면 빈 집합
+        """
+        anchors = self._anchors_in(block)
+        if not anchors:
+            return set()
+
+        for anchor in anchors:
+            if any(rx.search(block) for rx in self._excludes.get(anchor, ())):
+                return set()
+
+        return {
+            label
+            for anchor in anchors
+            for label, pat in self._symptoms.get(anchor, ())
+            if pat.search(block)
+        }
+
+    def has_symptom(self, line: str) -> bool:
+        """줄에 증상 패턴이 하나라도 있는지 (제외 패턴은 보지 않음)"""
+        for anchor in self._anchor_regex.findall(line):
+            for _, pat in self._symptoms.get(anchor, ()):
+                if pat.search(line):
+                    return True
+        return False
+
+SYMPTOM_MATCHER = SymptomMatcher(SYMPTOM_REGEXES, SYMPTOM_ANCHORS, EXCLUDE_REGEXES, EXCLUDE_ANCHORS)
+
 def is_block_start(line: str) -> bool:
     if line.startswith("*") or line.startswith("-"):
         return True
-    return any(p.search(line) for p in SYMPTOM_REGEXES.values())
+    return SYMPTOM_MATCHER.has_symptom(line)
 
 
 # -----------------------------
@@ -67,48 +145,125 @@ def apply_cause_template(cause_text: str) -> str:
     return cause_text
 
 # PDF 텍스트 추출
-def extract_text_from_pdf(pdf_path: str) -> str:
+def _open_pdf(source: Union[str, bytes]):
+    return pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+def _extract_pages(pdf, start: int, stop: int) -> List[Tuple[int, str, float]]:
+    """열려 있는 PDF에서 [start, stop) 페이지 추출 → (페이지 번호, 텍스트, 소요 초) 목록"""
+    pages = []
+    for i in range(start, min(stop, len(pdf.pages))):
+        t0 = time.perf_counter()
+        page_text = pdf.pages[i].extract_text() or ""
+        pages.append((i + 1, page_text, time.perf_counter() - t0))
+    return pages
+
+def _extract_page_range(source: Union[str, bytes], start: int, stop: int) -> List[Tuple[int, str, float]]:
+    """[start, stop) 페이지 추출 (프로세스 풀 작업 단위, 워커마다 PDF를 직접 엶)"""
+    with _open_pdf(source) as pdf:
+        return _extract_pages(pdf, start, stop)
+
+def extract_pages_from_pdf(source: Union[str, bytes], workers: int = None,
+                           start: int = 0, stop: int = None) -> List[Tuple[int, str, float]]:
+    """
+    페이지별 텍스트 추출 (페이지 순서 보장)
+    source: 파일 경로 또는 PDF 바이트
+    workers: 프로세스 수 (기본 OCR_WORKERS)
+    start, stop: 추출할 페이지 구간 [start, stop) (0부터, 기본 전체)
+    반환: [(페이지 번호(1부터), 텍스트, 추출 소요 초), ...]
+    """
+    workers = OCR_WORKERS if workers is None else workers
+    with _open_pdf(source) as pdf:
+        # 페이지 수를 센 핸들로 그대로 순차 추출 (PDF는 한 번만 파싱)
+        stop = len(pdf.pages) if stop is None else min(stop, len(pdf.pages))
+        if workers <= 1 or stop - start < PARALLEL_MIN_PAGES:
+            return _extract_pages(pdf, start, stop)
+
+    # 연속된 페이지 구간으로 나눠 워커마다 PDF를 직접 열게 함 (page 객체는 pickle 불가)
+    chunk = -(-(stop - start) // (workers * 2))
+    starts = list(range(start, stop, chunk))
+    stops = [min(s + chunk, stop) for s in starts]
+    # 서버 프로세스(FastAPI 스레드풀 등)는 스레드가 많아서 fork 대신 spawn (ingest_worker와 동일)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunks = pool.map(_extract_page_range, [source] * len(starts), starts, stops)
+        return [page for pages in chunks for page in pages]
+
+def join_page_texts(pages: List[Tuple[int, str, float]]) -> str:
+    """페이지 목록 → 문서 텍스트 (빈 페이지는 건너뛰고 페이지마다 줄바꿈)"""
+    return "".join(page_text + "\n" for _, page_text, _ in pages if page_text)
+
+def find_last_date_page(pages: List[Tuple[int, str, float]]) -> Optional[Tuple[int, str]]:
+    """마지막 날짜 헤더(# YYYY-MM-DD)가 있는 페이지 → (페이지 번호(1부터), 날짜)"""
+    for page_no, page_text, _ in reversed(pages):
+        for line in reversed(page_text.split("\n")):
+            m = DATE_LINE_REGEX.match(line.strip())
+            if m:
+                return page_no, m.group(1)
+    return None
+
+def extract_text_from_pdf(pdf_path: Union[str, bytes], workers: int = None) -> str:
     """
     PDF에서 텍스트 추출 (pdfplumber)
+    pdf_path: 파일 경로 또는 PDF 바이트
     """
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text
+    return join_page_texts(extract_pages_from_pdf(pdf_path, workers))
 
 # 날짜별 파싱
+DATE_LINE_REGEX = re.compile(r"#\s*(\d{4}-\d{2}-\d{2})")
 
-def parse_by_date(text: str) -> Dict[str, List[Tuple[str, str]]]:
-
-    records: Dict[str, List[Tuple[str, str]]] = {}
-    current_date: str = None
-    buffer: List[str] = []
-
-    def flush_buffer():
-        nonlocal buffer
-        if buffer and current_date:
-            block = " ".join(buffer)
-
-            if any(rx.search(block) for rx in EXCLUDE_REGEXES):
-                buffer = []
-                return
-
-            found_labels = set()
-            for label, pat in SYMPTOM_REGEXES.items():
-                if pat.search(block):
-                    found_labels.add(label)
-
-            if found_labels:
-
-                existing_labels = {kw for kw, _ in records.get(current_date, [])}
-                for label in found_labels - existing_labels:
-                    records[current_date].append((label, block))
-        buffer = []
+class NursingRecordParser:
+    """
+    parse_by_date의 증분(스트리밍) 파서
+    feed()에 텍스트 조각(줄/페이지)을 넣으면 완성된 (date, label, block) 레코드를 돌려줍니다.
+    조각 경계에 걸친 줄, 현재 날짜, 블록 버퍼는 다음 feed()로 이어지므로
+    메모리는 문서 전체가 아니라 조각 하나 + 날짜별 라벨 집합 정도만 사용합니다.
+    """
 
-    for raw_line in text.split("\n"):
+    def __init__(self):
+        self.current_date: str = None
+        self.buffer: List[str] = []
+        # 날짜별 이미 나온 라벨 (날짜 중복 라벨 제거용, 등장 순서 유지)
+        self.labels_by_date: Dict[str, set] = {}
+        self._pending = ""
+
+    @property
+    def dates(self) -> List[str]:
+        """지금까지 등장한 날짜 (레코드가 없는 날짜 포함)"""
+        return list(self.labels_by_date.keys())
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, str]]:
+        lines = (self._pending + chunk).split("\n")
+        # 마지막 조각은 줄이 덜 끝났을 수 있으므로 다음 feed까지 보류
+        self._pending = lines.pop()
+        completed: List[Tuple[str, str, str]] = []
+        for raw_line in lines:
+            self._feed_line(raw_line, completed)
+        return completed
+
+    def close(self) -> List[Tuple[str, str, str]]:
+        completed: List[Tuple[str, str, str]] = []
+        self._feed_line(self._pending, completed)
+        self._pending = ""
+        self._flush_buffer(completed)
+        return completed
+
+    def _flush_buffer(self, completed: List[Tuple[str, str, str]]):
+        buffer, self.buffer = self.buffer, []
+        if not (buffer and self.current_date):
+            return
+
+        block = " ".join(buffer)
+
+        # 제외 패턴이면 빈 집합
+        found_labels = SYMPTOM_MATCHER.match(block)
+
+        if found_labels:
+
+            existing_labels = self.labels_by_date[self.current_date]
+            for label in found_labels - existing_labels:
+                completed.append((self.current_date, label, block))
+            existing_labels |= found_labels
+
+    def _feed_line(self, raw_line: str, completed: List[Tuple[str, str, str]]):
         line = raw_line.strip()
 
         # 무시할 공통 머리말
@@ -116,24 +271,52 @@ def parse_by_date(text: str) -> Dict[str, List[Tuple[str, str]]]:
             or "효림요양병원" in line
             or "Page No" in line
             or "Nurse Record" in line):
-            continue
+            return
 
         # 날짜 라인
-        m = re.match(r"#\s*(\d{4}-\d{2}-\d{2})", line)
+        m = DATE_LINE_REGEX.match(line)
         if m:
-            flush_buffer()
-            current_date = m.group(1)
-            records.setdefault(current_date, [])
-            continue
+            self._flush_buffer(completed)
+            self.current_date = m.group(1)
+            self.labels_by_date.setdefault(self.current_date, set())
+            return
 
         # 블록 시작 판단
-        if current_date and is_block_start(line):
-            flush_buffer()
-            buffer = [line]
-        elif buffer:
-            buffer.append(line)
+        if self.current_date and is_block_start(line):
+            self._flush_buffer(completed)
+            self.buffer = [line]
+        elif self.buffer:
+            self.buffer.append(line)
 
-    flush_buffer()
+def iter_parse_by_date(chunks: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """
+    스트리밍 날짜별 파싱
+    chunks: 텍스트 조각 이터레이터 (줄바꿈 포함 줄, 페이지 텍스트 등)
+    완성되는 대로 (date, label, block)을 yield
+    """
+    parser = NursingRecordParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+def iter_pdf_page_texts(source: Union[str, bytes]) -> Iterator[str]:
+    """PDF 페이지 텍스트를 한 페이지씩 yield (extract_text_from_pdf와 같은 줄바꿈 규칙)"""
+    with _open_pdf(source) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                yield page_text + "\n"
+            # 추출이 끝난 페이지의 레이아웃 캐시 해제
+            page.close()
+
+def parse_by_date(text: str) -> Dict[str, List[Tuple[str, str]]]:
+
+    parser = NursingRecordParser()
+    completed = parser.feed(text) + parser.close()
+
+    records: Dict[str, List[Tuple[str, str]]] = {date: [] for date in parser.dates}
+    for date, label, block in completed:
+        records[date].append((label, block))
     return records
 
 def compare_changes_with_text(records: Dict[str, List[Tuple[str, str]]]) -> str:
@@ -166,8 +349,10 @@ def compare_changes_with_text(records: Dict[str, List[Tuple[str, str]]]) -> str:
 #JSON 구조로 가공해주는 헬퍼
 def build_nursing_notes_json(pdf_path):
 
-    text = extract_text_from_pdf(pdf_path)
-    records = parse_by_date(text)
+    return parse_nursing_pdf(pdf_path)["notes"]
+
+def build_notes_from_records(records: Dict[str, List[Tuple[str, str]]]) -> List[Dict]:
+    """parse_by_date 결과를 프론트용 notes JSON으로 변환 (PDF 재추출 없음)"""
     notes = []
     for date in sorted(records.keys()):
         items = [
@@ -178,4 +363,24 @@ def build_nursing_notes_json(pdf_path):
             for kw, cause in records[date]
         ]
         notes.append({"date": date, "items": items})
-    return notes
\ No newline at end of file
+    return notes
+
+# 단일 패스 파이프라인: PDF는 한 번만 열고 text / by_date / notes를 같이 만든다
+def parse_nursing_pdf(source: Union[str, bytes]) -> Dict:
+    """
+    source: 파일 경로 또는 PDF 바이트
+    반환: {"text": str, "by_date": {...}, "notes": [...], "page_timings": [(페이지, 초), ...]}
+    """
+    return build_parse_result(extract_pages_from_pdf(source))
+
+def build_parse_result(pages: List[Tuple[int, str, float]]) -> Dict:
+    """extract_pages_from_pdf 결과 → parse_nursing_pdf 반환 형식"""
+    text = join_page_texts(pages)
+    by_date = parse_by_date(text)
+    return {
+        "text": text,
+        "by_date": by_date,
+        "notes": build_notes_from_records(by_date),
+        # 페이지별 추출 시간(초) — 유난히 느린 페이지 추적용
+        "page_timings": [(page_no, round(seconds, 4)) for page_no, _, seconds in pages],
+    }
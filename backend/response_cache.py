@@ -0,0 +1,176 @@
+# backend/response_cache.py
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+# 캐시된 답변 유효 시간(초)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+# 프로세스당 최대 캐시 항목 수 (초과 시 가장 오래 안 쓴 항목부터 제거)
+RESPONSE_CACHE_MAX = int(os.getenv("RESPONSE_CACHE_MAX", "2000"))
+# 유사 질문 판정 기준 (문자 2-gram Dice 계수, 기본 0 = 끔: 정확히 같은 질문만 사용)
+#  - 2-gram은 부정("잘 와요" / "잘 안 와요")을 구분하지 못하므로 켤 때는 0.9 이상 권장
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+# 이보다 짧은 질문은 유사도 비교를 하지 않음 (정규화 후 글자 수)
+RESPONSE_CACHE_MIN_SIMILAR_CHARS = 6
+# 유사 일치 시 허용하는 길이 차이 (긴 쪽 글자 수 대비 비율)
+RESPONSE_CACHE_MAX_LENGTH_DIFF = 0.2
+
+_NON_WORD_REGEX = re.compile(r"[^\w]+")
+# 부정/반대 의미 표지: 안/못/않/없/아니, 불- 접두 (편하다 ↔ 불편하다)
+_NEGATION_REGEX = re.compile(r"안|못|않|없|아니|불")
+
+
+def normalize_question(text: str) -> str:
+    """
+    질문 정규화: 전각/호환 문자 통일(NFKC), 소문자, 문장부호/이모지 제거, 공백 하나로
+    예) "면회 시간은 언제인가요?? 😊" → "면회 시간은 언제인가요"
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    return " ".join(_NON_WORD_REGEX.sub(" ", text).split())
+
+
+def _bigrams(key: str) -> Set[str]:
+    compact = key.replace(" ", "")
+    return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+
+def _negations(key: str) -> Tuple[str, ...]:
+    return tuple(sorted(_NEGATION_REGEX.findall(key)))
+
+
+def _comparable(key: str, candidate: str) -> bool:
+    """
+    유사 일치로 답변을 재사용해도 되는지: 부정 표지가 같고 길이 차이가 크지 않아야 함
+    예) "잠이 잘 와요" ↔ "잠이 잘 안 와요", "편해지셨어요" ↔ "불편해지셨어요"는 거부
+    """
+    if _negations(key) != _negations(candidate):
+        return False
+    longer = max(len(key), len(candidate))
+    return abs(len(key) - len(candidate)) <= longer * RESPONSE_CACHE_MAX_LENGTH_DIFF
+
+
+class ResponseCache:
+    """
+    반복되는 보호자 질문(면회/식사 시간, 상태 문의 등)의 답변 캐시
+
+    - 정확 일치: 정규화한 질문 → 답변
+    - 유사 일치(similarity > 0일 때만): 문자 2-gram 역색인으로 후보를 모아
+      Dice 계수가 similarity 이상이고 부정 표지/길이가 맞으면 사용
+    - TTL이 지난 항목은 조회 시 제거, max_entries 초과 시 LRU 제거
+    """
+
+    def __init__(self,
+                 ttl: float = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._entries: "OrderedDict[str, Tuple[str, float, Set[str]]]" = OrderedDict()  # key → (답변, 만료 시각, 2-gram)
+        self._index: Dict[str, Set[str]] = {}  # 2-gram → key 집합
+        self._lock = threading.Lock()
+        self._counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+
+    def get(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        if not key:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            answer = self._lookup(key, now)
+            if answer is not None:
+                self._counters["exact_hits"] += 1
+                return answer
+
+            if self.similarity > 0 and len(key) >= RESPONSE_CACHE_MIN_SIMILAR_CHARS:
+                similar_key = self._most_similar(key)
+                if similar_key is not None:
+                    answer = self._lookup(similar_key, now)
+                    if answer is not None:
+                        self._counters["similar_hits"] += 1
+                        return answer
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, question: str, answer: str):
+        key = normalize_question(question)
+        if not key or not answer:
+            return
+
+        grams = _bigrams(key)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (answer, time.monotonic() + self.ttl, grams)
+            for gram in grams:
+                self._index.setdefault(gram, set()).add(key)
+            self._counters["stores"] += 1
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        hits = counters["exact_hits"] + counters["similar_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "size": size,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+    # ---------- 내부 (self._lock 안에서 호출) ----------
+    def _lookup(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            self._remove(key)
+            self._counters["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _most_similar(self, key: str) -> Optional[str]:
+        grams = _bigrams(key)
+        if not grams:
+            return None
+
+        # 2-gram을 공유하는 항목만 후보로 (전체 항목을 훑지 않음)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._index.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        best_key, best_score = None, self.similarity
+        for candidate, count in shared.items():
+            score = 2 * count / (len(grams) + len(self._entries[candidate][2]))
+            if score >= best_score and _comparable(key, candidate):
+                best_key, best_score = candidate, score
+        return best_key
+
+    def _remove(self, key: str):
+        _, _, grams = self._entries.pop(key)
+        for gram in grams:
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
+
+# 전역 캐시 인스턴스
+response_cache = ResponseCache()
@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# backend/ 모듈을 (cd backend && uvicorn main:app)과 같은 방식으로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
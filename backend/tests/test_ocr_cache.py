@@ -0,0 +1,81 @@
+# backend/tests/test_ocr_cache.py
+# 증분 재파싱(뒤에 페이지가 추가된 PDF) 결과가 전체 파싱과 같은지 확인
+import glob
+import json
+import os
+
+import pypdfium2 as pdfium
+import pytest
+
+import ocr_cache
+from ocr_cache import NursingNotesCache
+
+UPLOADS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
+SAMPLE_PDFS = sorted(glob.glob(os.path.join(UPLOADS, "*.pdf")))
+
+
+def write_pages(src_path: str, dest_path: str, page_count: int):
+    """src PDF의 앞 page_count 페이지만으로 dest PDF 작성 (기존 파일은 덮어씀)"""
+    src = pdfium.PdfDocument(src_path)
+    dest = pdfium.PdfDocument.new()
+    dest.import_pages(src, list(range(page_count)))
+    dest.save(dest_path)
+    dest.close()
+    src.close()
+
+
+def full_parse(tmp_path, pdf_path: str) -> dict:
+    return NursingNotesCache(db_path=str(tmp_path / "full.db")).get_or_build(pdf_path)
+
+
+@pytest.fixture
+def extract_calls(monkeypatch):
+    calls = []
+    extract = ocr_cache.extract_pages_from_pdf
+
+    def counting_extract(*args, **kwargs):
+        calls.append(kwargs)
+        return extract(*args, **kwargs)
+
+    monkeypatch.setattr(ocr_cache, "extract_pages_from_pdf", counting_extract)
+    return calls
+
+
+def assert_same_result(result: dict, expected: dict):
+    # 저장/응답 형식(JSON) 기준으로 비교 (새로 파싱한 레코드는 tuple, 캐시에서 읽은 레코드는 list)
+    for key in ("text", "by_date", "notes", "sha256"):
+        assert json.loads(json.dumps(result[key])) == json.loads(json.dumps(expected[key])), key
+
+
+@pytest.mark.skipif(not SAMPLE_PDFS, reason="uploads/에 샘플 PDF 없음")
+def test_appended_pdf_matches_full_parse(tmp_path, extract_calls):
+    pdf_path = str(tmp_path / "notes.pdf")
+    cache = NursingNotesCache(db_path=str(tmp_path / "cache.db"))
+
+    write_pages(SAMPLE_PDFS[0], pdf_path, 4)
+    cache.get_or_build(pdf_path)
+
+    write_pages(SAMPLE_PDFS[0], pdf_path, len(pdfium.PdfDocument(SAMPLE_PDFS[0])))
+    extract_calls.clear()
+    result = cache.get_or_build(pdf_path)
+
+    # 마지막 날짜 페이지 직전부터 한 번만 추출
+    assert extract_calls == [{"start": 2}]
+    assert_same_result(result, full_parse(tmp_path, pdf_path))
+
+
+@pytest.mark.skipif(len(SAMPLE_PDFS) < 2, reason="uploads/에 샘플 PDF 2개 필요")
+def test_changed_prefix_falls_back_to_full_parse(tmp_path, extract_calls):
+    pdf_path = str(tmp_path / "notes.pdf")
+    cache = NursingNotesCache(db_path=str(tmp_path / "cache.db"))
+
+    # 앞부분이 다른 문서로 바뀜 → 이미 추출한 뒷부분은 재사용하고 앞부분만 추가 추출
+    write_pages(SAMPLE_PDFS[1], pdf_path, 4)
+    cache.get_or_build(pdf_path)
+
+    write_pages(SAMPLE_PDFS[0], pdf_path, len(pdfium.PdfDocument(SAMPLE_PDFS[0])))
+    extract_calls.clear()
+    result = cache.get_or_build(pdf_path)
+
+    assert extract_calls == [{"start": 2}, {"stop": 2}]
+    assert_same_result(result, full_parse(tmp_path, pdf_path))
@@ -0,0 +1,68 @@
+# backend/tests/test_query_plans.py
+"""
+주요 조회가 인덱스를 타는지 확인 (EXPLAIN QUERY PLAN)
+인덱스가 빠지거나 쿼리가 바뀌어 전체 스캔/정렬용 임시 B-tree가 생기면 실패
+실제 DB 대신 임시 DB에 마이그레이션을 적용해서 확인
+"""
+import sqlite3
+
+import pytest
+
+from chat_log_queries import ChatLogQueries, SESSION_RECENT_SQL
+from database import DatabaseManager
+
+# (이름, SQL, 파라미터, 반드시 나와야 하는 인덱스)
+CAREBOT_QUERY_PLANS = [
+    ("get_user_patients", DatabaseManager.USER_PATIENTS_SQL, ("sample@naver.com",),
+     "idx_user_patient_relations_user_created"),
+    ("get_feedback_page (전체)",
+     *DatabaseManager.feedback_page_query(), "idx_feedback_created"),
+    ("get_feedback_page (전체, cursor)",
+     *DatabaseManager.feedback_page_query(after=("2024-01-01 12:00:00", 10)), "idx_feedback_created"),
+    ("get_feedback_page (사용자)",
+     *DatabaseManager.feedback_page_query(user_email="sample@naver.com"), "idx_feedback_user_created"),
+    ("get_feedback_page (사용자, cursor)",
+     *DatabaseManager.feedback_page_query(after=("2024-01-01 12:00:00", 10), user_email="sample@naver.com"),
+     "idx_feedback_user_created"),
+]
+
+CHAT_LOG_QUERY_PLANS = [
+    ("transcript", ChatLogQueries.TRANSCRIPT_SQL, ("session", 0, 51), "idx_chat_log_session_id"),
+    ("load_chat_history", SESSION_RECENT_SQL, ("session", 20), "idx_chat_log_session_id"),
+]
+
+
+def query_plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def assert_uses_index(plan, index):
+    assert any(index in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+@pytest.fixture
+def carebot_db(tmp_path):
+    manager = DatabaseManager(db_path=str(tmp_path / "carebot.db"))
+    yield manager
+    manager.close_all()
+
+
+@pytest.mark.parametrize("name, sql, params, index", CAREBOT_QUERY_PLANS, ids=[p[0] for p in CAREBOT_QUERY_PLANS])
+def test_carebot_query_uses_index(carebot_db, name, sql, params, index):
+    assert_uses_index(query_plan(carebot_db._connect(), sql, params), index)
+
+
+@pytest.fixture
+def chat_log_db(tmp_path):
+    # init_database가 migrate_chat_log까지 적용함
+    queries = ChatLogQueries(db_path=str(tmp_path / "chat_logs.db"))
+    queries.init_database()
+    conn = sqlite3.connect(queries.db_path)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("name, sql, params, index", CHAT_LOG_QUERY_PLANS, ids=[p[0] for p in CHAT_LOG_QUERY_PLANS])
+def test_chat_log_query_uses_index(chat_log_db, name, sql, params, index):
+    assert_uses_index(query_plan(chat_log_db, sql, params), index)
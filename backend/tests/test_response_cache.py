@@ -0,0 +1,43 @@
+# backend/tests/test_response_cache.py
+import pytest
+
+from response_cache import RESPONSE_CACHE_SIMILARITY, ResponseCache
+
+
+def test_similarity_is_off_by_default():
+    assert RESPONSE_CACHE_SIMILARITY == 0
+
+    cache = ResponseCache()
+    cache.put("면회 시간은 언제인가요", "오후 2시~5시입니다.")
+    assert cache.get("면회 시간은 언제인가요??") == "오후 2시~5시입니다."
+    assert cache.get("면회 시간은 언제인가요 알려주세요") is None
+
+
+def test_similar_question_hits_when_enabled():
+    cache = ResponseCache(similarity=0.8)
+    cache.put("어머니 면회 시간은 언제인가요", "오후 2시~5시입니다.")
+    assert cache.get("어머님 면회 시간은 언제인가요") == "오후 2시~5시입니다."
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("요즘 잠이 잘 와요", "요즘 잠이 잘 안 와요"),
+    ("요즘 잠이 잘 와요", "요즘 잠이 잘 안와요"),
+    ("아버지가 식사를 잘 하셨나요", "아버지가 식사를 잘 못 하셨나요"),
+    ("어머니가 걷기 편해지셨나요", "어머니가 걷기 불편해지셨나요"),
+    ("어머니 통증이 있으신가요", "어머니 통증이 없으신가요"),
+    ("약을 드시고 괜찮으신가요", "약을 드시고 괜찮지 않으신가요"),
+])
+def test_negation_pairs_do_not_share_answers(cached, asked):
+    cache = ResponseCache(similarity=0.5)
+    cache.put(cached, "cached answer")
+    assert cache.get(asked) is None
+    # 반대 방향도 마찬가지
+    cache = ResponseCache(similarity=0.5)
+    cache.put(asked, "cached answer")
+    assert cache.get(cached) is None
+
+
+def test_large_length_difference_does_not_match():
+    cache = ResponseCache(similarity=0.5)
+    cache.put("면회 시간 알려주세요", "오후 2시~5시입니다.")
+    assert cache.get("면회 시간 알려주세요 주말이랑 공휴일에도 면회가 되나요") is None
@@ -26,8 +26,11 @@ export default function ChatBotPage() {
     setInput('');
     setLoading(true);
 
+    // 스트리밍용 봇 말풍선을 추가했는지 (오류 시 그 말풍선을 오류 문구로 교체)
+    let botBubbleAdded = false;
     try {
-      const res = await fetch(`${API_BASE}/chat`, {
+      // SSE 스트리밍: 토큰이 도착하는 대로 말풍선에 이어 붙임
+      const res = await fetch(`${API_BASE}/chat/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -36,24 +39,51 @@ export default function ChatBotPage() {
         }),
       });
 
-      if (!res.ok) {
+      if (!res.ok || !res.body) {
         const errText = await res.text().catch(() => '');
         throw new Error(`HTTP ${res.status} ${res.statusText} ${errText || ''}`);
       }
 
-      const data = await res.json();
-      const botText =
-        data && typeof data.reply === 'string'
-          ? data.reply
-          : '⚠️ 알 수 없는 응답 형식입니다.';
-
-      setMessages(prev => [...prev, { sender: 'bot', text: botText }]);
+      // 빈 봇 말풍선을 먼저 추가하고 토큰을 누적
+      setMessages(prev => [...prev, { sender: 'bot', text: '' }]);
+      botBubbleAdded = true;
+      const appendToBot = (token) =>
+        setMessages(prev => {
+          const next = [...prev];
+          const last = next[next.length - 1];
+          next[next.length - 1] = { ...last, text: last.text + token };
+          return next;
+        });
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder('utf-8');
+      let buffer = '';
+      let streamError = null;
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE 이벤트는 빈 줄(\n\n)로 구분
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const evt of events) {
+          const eventLine = evt.split('\n').find(l => l.startsWith('event:'));
+          const dataLine = evt.split('\n').find(l => l.startsWith('data:'));
+          const eventType = eventLine ? eventLine.slice(6).trim() : 'message';
+          const data = dataLine ? JSON.parse(dataLine.slice(5)) : {};
+          if (eventType === 'error') streamError = data.detail || 'stream error';
+          else if (eventType === 'message' && typeof data.token === 'string') appendToBot(data.token);
+        }
+      }
+      if (streamError) throw new Error(streamError);
     } catch (err) {
       console.error(err);
-      setMessages(prev => [
-        ...prev,
-        { sender: 'bot', text: '⚠️ 서버 연결/처리 중 오류가 발생했습니다.' },
-      ]);
+      const errorMsg = { sender: 'bot', text: '⚠️ 서버 연결/처리 중 오류가 발생했습니다.' };
+      setMessages(prev =>
+        // 빈/일부만 받은 봇 말풍선이 있으면 그 자리에 오류 문구를 표시
+        botBubbleAdded ? [...prev.slice(0, -1), errorMsg] : [...prev, errorMsg]
+      );
     } finally {
       setLoading(false);
     }
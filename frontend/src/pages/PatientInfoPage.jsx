@@ -4,6 +4,10 @@ import { useParams } from "react-router-dom";
 import Header from "../components/Header";
 import PatientHistoryCard from "../components/PatientHistoryCard";
 
+// 간호기록 파싱 대기(202) 시 재요청 간격/횟수
+const NOTES_POLL_INTERVAL_MS = 1000;
+const NOTES_POLL_MAX_ATTEMPTS = 60;
+
 export default function PatientInfoPage() {
   const { patientId: routePatientId } = useParams();
   const [patientId, setPatientId] = useState(routePatientId || "25-0000032");
@@ -68,7 +72,14 @@ export default function PatientInfoPage() {
       setLoading(true);
       setError("");
       try {
-        const res = await fetch(`${API_BASE}/patients/${patientId}/nursing-notes`);
+        let res = await fetch(`${API_BASE}/patients/${patientId}/nursing-notes`);
+        // 202 = 아직 PDF 파싱 중 → 작업이 끝날 때까지 잠시 간격을 두고 다시 요청
+        for (let attempt = 0; res.status === 202 && attempt < NOTES_POLL_MAX_ATTEMPTS; attempt++) {
+          await new Promise((resolve) => setTimeout(resolve, NOTES_POLL_INTERVAL_MS));
+          if (ignore) return;
+          res = await fetch(`${API_BASE}/patients/${patientId}/nursing-notes`);
+        }
+        if (res.status === 202) throw new Error("간호기록을 분석 중입니다. 잠시 후 다시 시도해 주세요.");
         if (!res.ok) {
           const { detail } = await res.json().catch(() => ({ detail: res.statusText }));
           throw new Error(detail || `API Error ${res.status}`);